@@ -1,21 +1,25 @@
 import os
 import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import SimpleNamespace
 from extensions import db
-from app import app
 from models import Category, Tag, GuideContent
-import google.generativeai as genai
+from utils.clients import get_ai_model
+from utils.ai_parsing import parse_guide
 from datetime import datetime, timezone
 
-# 1. 配置 AI
-API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=API_KEY)
+# 单次生成的最大重试次数（网络错误、JSON 解析失败都会重试）
+GENERATE_RETRIES = 3
 
-# 2. 选择你列表中的可用模型
-# 这里使用了你诊断列表中的 gemini-2.0-flash
-model = genai.GenerativeModel('gemini-flash-latest')
 
-def generate_psychology_content(category_name, tag_names):
-    prompt = f"""
+def build_prompt(category_name, tag_names, variant=None):
+    # variant 用于批量生成：同一分类 + 标签下的第几篇，提示模型换一个切入角度，避免内容重复
+    angle = f"\n    4. 这是该主题下的第 {variant} 篇，请选择与常见文章不同的切入角度和案例。" if variant else ""
+    return f"""
     你是一名资深的心理咨询师。请为我的“心理指南”网站撰写一篇关于“{category_name}”的高质量指南。
     要求如下：
     1. 针对标签：{', '.join(tag_names)}。
@@ -23,27 +27,191 @@ def generate_psychology_content(category_name, tag_names):
     3. 输出格式必须为 JSON，包含以下字段：
        - title: 引人入胜的标题（含表情符号）
        - summary: 100字以内的简介
-       - content: 完整的 Markdown 格式文章（包含具体案例、建议、练习方法）
+       - content: 完整的 Markdown 格式文章（包含具体案例、建议、练习方法）{angle}
     请直接输出 JSON 内容，不要包含任何 Markdown 格式的包裹符号（如 ```json）。
     """
-    
-    response = model.generate_content(prompt)
-    raw_text = response.text.strip()
-    
-    # 核心修复：清理可能存在的 Markdown 代码块标签
-    if raw_text.startswith("```"):
-        # 提取第一个 ``` 和最后一个 ``` 之间的内容
-        lines = raw_text.splitlines()
-        # 去掉第一行 ```json 和最后一行 ```
-        if lines[0].startswith("```"):
-            lines = lines[1:]
-        if lines[-1].startswith("```"):
-            lines = lines[:-1]
-        raw_text = "\n".join(lines).strip()
-    
-    return json.loads(raw_text)
+
+
+def generate_psychology_content(category_name, tag_names, model=None, variant=None):
+    response = (model or get_ai_model()).generate_content(build_prompt(category_name, tag_names, variant))
+    # 代码块包裹、字符串中的大括号、多余逗号等情况由共享的解析模块处理；
+    # 被截断的文章不直接入库，抛出异常交给批量生成的重试
+    return parse_guide(response.text, allow_truncated=False)
+
+
+class FakeModel:
+    """
+    离线假模型：不访问网络，根据提示词生成固定格式的 JSON，
+    用于在没有 GEMINI_API_KEY 的环境里演练批量生成流程
+    :param latency: 模拟每次调用的耗时（秒）
+    :param failure_rate: 模拟调用失败的概率
+    """
+    model_name = 'fake'
+
+    def __init__(self, latency=0.05, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def generate_content(self, prompt, stream=False):
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise RuntimeError("FakeModel 模拟调用失败")
+        digest = hashlib.md5(prompt.encode()).hexdigest()[:8]
+        text = json.dumps({
+            'title': f"🌱 示例指南 {digest}",
+            'summary': "这是离线假模型生成的示例简介。",
+            'content': f"# 示例指南 {digest}\n\n这是离线假模型生成的示例正文。",
+        }, ensure_ascii=False)
+        text = f"```json\n{text}\n```"
+        if stream:
+            # 与 Gemini 的 stream=True 一样，返回逐段产出的片段
+            return (SimpleNamespace(text=text[i:i + 16]) for i in range(0, len(text), 16))
+        return SimpleNamespace(text=text)
+
+
+class RateLimiter:
+    """按固定间隔放行请求：rate 为每秒最多发起的调用数，多线程共享"""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Checkpoint:
+    """
+    断点记录：每个已入库任务的 key 追加一行到文件，
+    中断后重新执行同一命令会跳过已完成的任务
+    """
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = {line.strip() for line in f if line.strip()}
+
+    def mark(self, keys):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for key in keys:
+                f.write(key + '\n')
+        self.done.update(keys)
+
+
+def _get_or_create(model, name, **defaults):
+    obj = model.query.filter_by(name=name).first()
+    if not obj:
+        obj = model(name=name, **defaults)
+        db.session.add(obj)
+    return obj
+
+
+def _generate_with_retry(model, limiter, job):
+    last_error = None
+    for attempt in range(GENERATE_RETRIES):
+        limiter.wait()
+        try:
+            return generate_psychology_content(job['category'], [job['tag']], model=model, variant=job['n'])
+        except Exception as e:
+            last_error = e
+            time.sleep(min(2 ** attempt, 10) * 0.5)
+    raise last_error
+
+
+def seed_batch(category_names, tag_names, count, workers=8, rate=5, chunk_size=20,
+               model=None, checkpoint_path=None, log=print):
+    """
+    批量生成：对 分类 × 标签 的每个组合各生成 count 篇
+    :param workers: 并发请求数
+    :param rate: 每秒最多发起的模型调用数
+    :param chunk_size: 每攒够多少篇提交一次事务
+    :param model: 具有 generate_content(prompt) 方法的模型对象，默认使用 Gemini
+    :param checkpoint_path: 断点文件路径，默认 instance/seed_checkpoint.txt
+    :return: (成功入库数, 失败数, 跳过数)
+    """
+    from flask import current_app
+    from utils.search import index_guide
+    from utils.taxonomy_cache import taxonomy_cache
+
+    model = model or get_ai_model()
+    checkpoint = Checkpoint(checkpoint_path or os.path.join(current_app.instance_path, 'seed_checkpoint.txt'))
+
+    # 分类和标签在主线程中一次性准备好，工作线程只负责调用模型
+    categories = {name: _get_or_create(Category, name) for name in category_names}
+    tags = {name: _get_or_create(Tag, name) for name in tag_names}
+    db.session.commit()
+
+    jobs = [
+        {'key': f"{cat}|{tag}|{n}", 'category': cat, 'tag': tag, 'n': n}
+        for cat in category_names for tag in tag_names for n in range(1, count + 1)
+    ]
+    pending = [job for job in jobs if job['key'] not in checkpoint.done]
+    skipped = len(jobs) - len(pending)
+    log(f"🚀 使用 {getattr(model, 'model_name', model)} 生成 {len(pending)} 篇（已完成跳过 {skipped} 篇）")
+
+    existing_titles = {t for (t,) in db.session.query(GuideContent.title)}
+    limiter = RateLimiter(rate)
+    created = failed = 0
+    buffer = []
+
+    def flush():
+        nonlocal created
+        if not buffer:
+            return
+        guides = []
+        for job, data in buffer:
+            guide = GuideContent(
+                title=data['title'], summary=data['summary'], content=data['content'],
+                category_id=categories[job['category']].id, tags=[tags[job['tag']]], is_published=True
+            )
+            db.session.add(guide)
+            guides.append(guide)
+        db.session.commit()
+        # 事务提交后才记录断点，保证断点里的任务一定已经入库
+        checkpoint.mark([job['key'] for job, _ in buffer])
+        for guide in guides:
+            index_guide(guide)
+        created += len(buffer)
+        log(f"  已入库 {created}/{len(pending)}")
+        buffer.clear()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_generate_with_retry, model, limiter, job): job for job in pending}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                failed += 1
+                log(f"❌ {job['key']} 生成失败: {e}")
+                continue
+            if data['title'] in existing_titles:
+                # 标题重复视为已完成，下次不再生成
+                checkpoint.mark([job['key']])
+                skipped += 1
+                continue
+            existing_titles.add(data['title'])
+            buffer.append((job, data))
+            if len(buffer) >= chunk_size:
+                flush()
+        flush()
+
+    taxonomy_cache.bump()
+    log(f"✅ 完成：入库 {created} 篇，失败 {failed} 篇，跳过 {skipped} 篇（失败的任务重新执行命令即可续跑）")
+    return created, failed, skipped
+
 
 def seed_content():
+    from app import app
     with app.app_context():
         # 获取或创建分类
         cat = Category.query.filter_by(name='情绪调节').first()
@@ -62,10 +230,10 @@ def seed_content():
             tag_list.append(t)
         db.session.commit()
 
-        print(f"🚀 正在调用 {model.model_name} 生成 AI 内容...")
+        print(f"🚀 正在调用 {get_ai_model().model_name} 生成 AI 内容...")
         try:
             data = generate_psychology_content(cat.name, [t.name for t in tag_list])
-            
+
             new_guide = GuideContent(
                 title=data['title'],
                 summary=data['summary'],
@@ -74,7 +242,7 @@ def seed_content():
                 tags=tag_list,
                 is_published=True
             )
-            
+
             db.session.add(new_guide)
             db.session.commit()
             print(f"✅ 成功导入指南: {data['title']}")
@@ -82,4 +250,4 @@ def seed_content():
             print(f"❌ 导入失败: {str(e)}")
 
 if __name__ == "__main__":
-    seed_content()
\ No newline at end of file
+    seed_content()
@@ -1,5 +1,7 @@
 import os
+import atexit
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_migrate import Migrate
 from extensions import db, login_manager
 from models import User, Category, GuideContent, Feedback, ActivationCode # 确保所有模型都被导入过
@@ -8,6 +10,15 @@ from blueprints.auth import auth_bp
 from blueprints.main import main_bp
 from blueprints.admin import admin_bp
 from blueprints.content import content_bp
+from utils.view_counter import view_counter
+from utils import clients
+from utils.ai_jobs import ai_jobs
+from utils.images import cover_src, cover_srcset, cover_builder
+from utils.related import related_refresher
+from utils.user_cache import user_cache
+from utils.passwords import password_hasher
+from utils.rate_limit import rate_limiter
+from commands import register_commands
 
 app = Flask(__name__)
 
@@ -23,14 +34,63 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
     'sqlite:///zhinan.db'
 ).replace('postgres://', 'postgresql://') # 这是一个兼容性小修复
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 阅读数缓冲写回数据库的间隔（秒）
+app.config['VIEW_FLUSH_INTERVAL'] = int(os.environ.get('VIEW_FLUSH_INTERVAL', 5))
+# 收藏变化后重算相关推荐的间隔（秒）
+app.config['RELATED_REFRESH_INTERVAL'] = int(os.environ.get('RELATED_REFRESH_INTERVAL', 30))
+# OSS 客户端：连接池大小、超时（秒）、网络错误重试次数
+app.config['OSS_POOL_SIZE'] = int(os.environ.get('OSS_POOL_SIZE', 10))
+app.config['OSS_CONNECT_TIMEOUT'] = int(os.environ.get('OSS_CONNECT_TIMEOUT', 10))
+app.config['OSS_MAX_RETRIES'] = int(os.environ.get('OSS_MAX_RETRIES', 3))
+# 大文件分片上传：超过阈值（字节）走断点续传，分片大小（字节）与并行分片数
+app.config['OSS_MULTIPART_THRESHOLD'] = int(os.environ.get('OSS_MULTIPART_THRESHOLD', 20 * 1024 * 1024))
+app.config['OSS_PART_SIZE'] = int(os.environ.get('OSS_PART_SIZE', 8 * 1024 * 1024))
+app.config['OSS_UPLOAD_THREADS'] = int(os.environ.get('OSS_UPLOAD_THREADS', 4))
+# AI 后台任务：每个进程的工作线程数（设为 0 时改由 `flask ai-jobs work` 独立进程执行）、结果复用时间（秒）
+app.config['AI_JOB_WORKERS'] = int(os.environ.get('AI_JOB_WORKERS', 2))
+app.config['AI_RESULT_CACHE_TTL'] = int(os.environ.get('AI_RESULT_CACHE_TTL', 7 * 24 * 3600))
+# AI 网关：模型输出的磁盘缓存目录与有效期（秒，0 为永久）、每日 token 预算（0 为不限制）
+app.config['AI_CACHE_DIR'] = os.environ.get('AI_CACHE_DIR', os.path.join(app.instance_path, 'ai_cache'))
+app.config['AI_CACHE_TTL'] = int(os.environ.get('AI_CACHE_TTL', 0))
+app.config['AI_DAILY_TOKEN_BUDGET'] = int(os.environ.get('AI_DAILY_TOKEN_BUDGET', 0))
+# 密码哈希：算法与成本（werkzeug method 写法）、同时计算的线程数（默认 CPU 核数）、允许排队的数量
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+# 登录/激活限流：设置 RATE_LIMIT_STORAGE_URL=redis://... 时多个 worker 共享令牌桶，否则各进程各自计数
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+app.config['RATE_LIMIT_STORAGE_URL'] = os.environ.get('RATE_LIMIT_STORAGE_URL')
+# 前面有几层反向代理（PaaS 的负载均衡算一层）：按 X-Forwarded-For 取真实客户端 IP，否则所有人共用代理的 IP、共用一个限流桶；
+# 直接对外提供服务时设为 0，避免客户端伪造 X-Forwarded-For 绕过限流
+app.config['PROXY_FIX_HOPS'] = int(os.environ.get('PROXY_FIX_HOPS', 1))
+# 后台单次生成激活码的上限（更大的批次用 `flask codes generate`）
+app.config['ACTIVATION_CODE_MAX_BATCH'] = int(os.environ.get('ACTIVATION_CODE_MAX_BATCH', 100000))
 
 # 1. 初始化扩展
 db.init_app(app)
 login_manager.init_app(app)
+view_counter.init_app(app)
+clients.init_app(app)
+ai_jobs.init_app(app)
+cover_builder.init_app(app)
+related_refresher.init_app(app)
+password_hasher.init_app(app)
+rate_limiter.init_app(app)
+register_commands(app)
+if app.config['PROXY_FIX_HOPS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_HOPS'])
+
+# worker 退出时把内存中尚未写回的阅读数落库
+def _flush_views_on_exit():
+    with app.app_context():
+        view_counter.flush()
+
+atexit.register(_flush_views_on_exit)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # 每个请求都会调用：返回缓存的用户快照，不再每次按主键查询
+    return user_cache.get(int(user_id))
 
 # 2. 注册蓝图
 app.register_blueprint(auth_bp) # 默认前缀
@@ -38,12 +98,17 @@ app.register_blueprint(main_bp)
 app.register_blueprint(admin_bp, url_prefix='/admin')
 app.register_blueprint(content_bp)
 
+# 模板中按展示尺寸选用封面衍生图
+app.add_template_global(cover_src)
+app.add_template_global(cover_srcset)
+
 @app.context_processor
 def inject_global_data():
     try:
         # 加上 try-except，如果表不存在，先给页面返回空列表
-        from models import Category
-        all_categories = Category.query.all()
+        # 分类数据来自内存缓存，后台修改分类时会自动刷新
+        from utils.taxonomy_cache import taxonomy_cache
+        all_categories = taxonomy_cache.get().categories
     except Exception:
         all_categories = []
     return dict(all_categories=all_categories)
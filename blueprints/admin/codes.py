@@ -1,9 +1,12 @@
 # blueprints/admin/codes.py
-import uuid
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import re
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required
 from extensions import db
 from models import ActivationCode
+from utils.pagination import paginate_cached
+from utils.activation_codes import generate_codes as generate_code_batch
+from utils.export import stream_export, export_format
 from . import admin_required
 
 codes_bp = Blueprint('admin_codes', __name__, url_prefix='/codes')
@@ -13,29 +16,60 @@ codes_bp = Blueprint('admin_codes', __name__, url_prefix='/codes')
 @admin_required
 def list_codes():
     page = request.args.get('page', 1, type=int)
+    batch_id = request.args.get('batch_id', '').strip()
+    query = ActivationCode.query
+    if batch_id:
+        query = query.filter_by(batch_id=batch_id)
     # 分页显示激活码
-    pagination = ActivationCode.query.order_by(ActivationCode.id.desc()).paginate(page=page, per_page=20)
-    return render_template('admin/codes/list.html', codes=pagination.items, pagination=pagination)
+    pagination = paginate_cached(query.order_by(ActivationCode.id.desc()), page=page, per_page=20)
+    return render_template('admin/codes/list.html', codes=pagination.items, pagination=pagination, batch_id=batch_id)
 
 @codes_bp.route('/generate', methods=['POST'])
 @login_required
 @admin_required
 def generate_codes():
-    for _ in range(10):
-        random_code = str(uuid.uuid4())[:8].upper()
-        # 确保激活码不重复
-        if not ActivationCode.query.filter_by(code=random_code).first():
-            # 修正点：使用 is_used=False 替代 status='可用'
-            db.session.add(ActivationCode(code=random_code, is_used=False))
-    db.session.commit()
-    flash('成功生成 10 个新激活码！', 'success')
-    return redirect(url_for('admin.admin_codes.list_codes'))
+    max_count = current_app.config.get('ACTIVATION_CODE_MAX_BATCH', 100000)
+    count = request.form.get('count', 10, type=int) or 10
+    if not 1 <= count <= max_count:
+        flash(f'单次最多生成 {max_count} 个，更大的批次请使用 flask codes generate 命令', 'danger')
+        return redirect(url_for('admin.admin_codes.list_codes'))
+    try:
+        batch_id, created = generate_code_batch(count)
+    except RuntimeError as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
+        return redirect(url_for('admin.admin_codes.list_codes'))
+    flash(f'成功生成 {created} 个新激活码（批次 {batch_id}）', 'success')
+    return redirect(url_for('admin.admin_codes.list_codes', batch_id=batch_id))
+
+@codes_bp.route('/export')
+@login_required
+@admin_required
+def export_codes():
+    """流式导出激活码（?format=csv|ndjson），可按批次、仅可用码筛选"""
+    batch_id = request.args.get('batch_id', '').strip()
+    query = db.session.query(
+        ActivationCode.code, ActivationCode.is_used, ActivationCode.used_by_username,
+        ActivationCode.batch_id, ActivationCode.created_at
+    )
+    if batch_id:
+        query = query.filter(ActivationCode.batch_id == batch_id)
+    if request.args.get('available') == '1':
+        query = query.filter(ActivationCode.is_used == False)
+    columns = [
+        ('code', '激活码', None),
+        ('is_used', '状态', lambda used: '已用' if used else '可用'),
+        ('used_by_username', '使用者', None),
+        ('batch_id', '批次', None),
+        ('created_at', '创建时间', None),
+    ]
+    filename = f"activation_codes_{re.sub(r'[^0-9A-Za-z_-]', '', batch_id) or 'all'}"
+    return stream_export(query.order_by(ActivationCode.id), columns, filename, fmt=export_format())
 
 @codes_bp.route('/api/copy-available')
 @login_required
 @admin_required
 def get_available_codes():
-    # 查询所有未被使用的激活码
-    available = ActivationCode.query.filter_by(is_used=False).all()
-    code_text = "\n".join([c.code for c in available])
-    return jsonify({"success": True, "data": code_text})
\ No newline at end of file
+    # 所有未使用的激活码，每行一个；流式输出，库存再大也不会一次性载入内存
+    query = db.session.query(ActivationCode.code).filter_by(is_used=False).order_by(ActivationCode.id)
+    return stream_export(query, [('code', '激活码', None)], 'available_codes', header=False)
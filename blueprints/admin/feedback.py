@@ -1,7 +1,9 @@
 # blueprints/admin/feedback.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
-from models import Feedback, db
+from models import Feedback, User, db
+from utils.pagination import paginate_cached
+from utils.export import stream_export, export_format
 from . import admin_required
 
 # 定义子蓝图
@@ -15,7 +17,8 @@ def list_feedback():
     page = request.args.get('page', 1, type=int)
     
     # 2. 启用分页查询，每页显示 10 条反馈
-    pagination = Feedback.query.order_by(Feedback.created_at.desc()).paginate(
+    pagination = paginate_cached(
+        Feedback.query.order_by(Feedback.created_at.desc(), Feedback.id.desc()),
         page=page, per_page=10, error_out=False
     )
     
@@ -33,4 +36,25 @@ def update_status(id, status):
     item.status = status
     db.session.commit()
     flash('状态已更新', 'success')
-    return redirect(url_for('admin.admin_feedback.list_feedback'))
\ No newline at end of file
+    return redirect(url_for('admin.admin_feedback.list_feedback'))
+
+@feedback_bp.route('/export')
+@login_required
+@admin_required
+def export_feedback():
+    """流式导出全部反馈（?format=csv|ndjson），带上提交用户的昵称和手机号"""
+    query = db.session.query(
+        Feedback.id, Feedback.created_at, User.username, User.phone, Feedback.contact,
+        Feedback.status, Feedback.content
+    ).outerjoin(User, User.id == Feedback.user_id).order_by(Feedback.created_at.desc(), Feedback.id.desc())
+    status_names = {0: '待处理', 1: '已采纳', 2: '已回复'}
+    columns = [
+        ('id', 'ID', None),
+        ('created_at', '提交时间', None),
+        ('username', '用户', None),
+        ('phone', '手机号', None),
+        ('contact', '联系方式', None),
+        ('status', '状态', lambda status: status_names.get(status, status)),
+        ('content', '反馈内容', None),
+    ]
+    return stream_export(query, columns, 'feedback', fmt=export_format())
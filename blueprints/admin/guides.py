@@ -1,20 +1,22 @@
 # blueprints/admin/guides.py 管理后台指南内容管理控制
-import os, re, json
-import google.generativeai as genai
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
-from flask_login import login_required
+from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, stream_with_context
+from flask_login import login_required, current_user
 from extensions import db
 from models import GuideContent, Category, Tag
-from utils.oss_helper import OssHelper
+from utils.clients import get_oss_helper
+from utils.render_cache import guide_render_cache
+from utils.taxonomy_cache import taxonomy_cache
+from utils.search import index_guide
+from utils.related import refresh_related
+from utils.pagination import paginate_cached
+from utils.images import cover_builder
+from utils.ai_jobs import ai_jobs, FINISHED
+from utils.ai_stream import sse_event
+from utils.ai_parsing import parse_guide
 from . import admin_required
 
 # 定义子蓝图
 guides_bp = Blueprint('admin_guides', __name__, url_prefix='/guides')
-oss_helper = OssHelper()
-
-# 配置 Gemini AI
-genai.configure(api_key=os.getenv("GEMINI_API_KEY")) 
-model = genai.GenerativeModel('gemini-flash-latest')
 
 @guides_bp.route('/')
 @login_required
@@ -22,7 +24,7 @@ model = genai.GenerativeModel('gemini-flash-latest')
 def manage_guides():
     # 增加分页逻辑，每页显示 10 条指南
     page = request.args.get('page', 1, type=int)
-    pagination = GuideContent.query.order_by(GuideContent.updated_at.desc()).paginate(page=page, per_page=10)
+    pagination = paginate_cached(GuideContent.query.order_by(GuideContent.updated_at.desc(), GuideContent.id.desc()), page=page, per_page=10)
     return render_template('admin/guides.html', guides=pagination.items, pagination=pagination)
 
 @guides_bp.route('/add', methods=['GET', 'POST'])
@@ -39,7 +41,7 @@ def add_guide():
         file = request.files.get('cover_file')
         
         if file and file.filename != '':
-            cover_url = oss_helper.upload_file(file, folder='images', is_private=False)
+            cover_url = get_oss_helper().upload_file(file, folder='images', is_private=False)
 
         # 核心改进：如果没有上传也没有填链接，给一个系统默认图
         if not cover_url:
@@ -52,6 +54,12 @@ def add_guide():
         )
         db.session.add(new_guide)
         db.session.commit()
+        # 后台生成缩略图/卡片/大图三种 WebP 衍生图，列表页不再加载原图
+        cover_builder.schedule(new_guide.id)
+        guide_render_cache.invalidate(new_guide.id, new_guide.updated_at)
+        taxonomy_cache.bump() # 分类/标签下的指南数量有变化
+        index_guide(new_guide)
+        refresh_related(new_guide)
         flash('🎉 指南已成功发布！', 'success')
         return redirect(url_for('admin.admin_guides.manage_guides')) # 注意路径
     
@@ -66,16 +74,29 @@ def add_guide():
 def edit_guide(guide_id):
     guide = GuideContent.query.get_or_404(guide_id)
     if request.method == 'POST':
+        # 记录旧版本，保存后清理它的渲染缓存
+        old_updated_at = guide.updated_at
         guide.title = request.form.get('title')
         guide.summary = request.form.get('summary')
         guide.content = request.form.get('content')
-        guide.cover_image_url = request.form.get('cover_image_url')
+        cover_url = request.form.get('cover_image_url')
+        # 封面有变化时清掉旧衍生图（生成完成前显示新原图），提交后重新生成
+        cover_changed = cover_url != guide.cover_image_url or not guide.cover_variants
+        if cover_url != guide.cover_image_url:
+            guide.cover_variants = None
+        guide.cover_image_url = cover_url
         guide.category_id = request.form.get('category_id')
         
         tag_ids = request.form.getlist('tags')
         guide.tags = Tag.query.filter(Tag.id.in_(tag_ids)).all()
         
         db.session.commit()
+        if cover_changed:
+            cover_builder.schedule(guide.id)
+        guide_render_cache.invalidate(guide.id, old_updated_at)
+        taxonomy_cache.bump()
+        index_guide(guide)
+        refresh_related(guide)
         flash(f'指南《{guide.title}》已更新！', 'success')
         
         return redirect(url_for('admin.admin_guides.manage_guides'))
@@ -84,48 +105,81 @@ def edit_guide(guide_id):
     tags = Tag.query.all()
     return render_template('admin/edit.html', guide=guide, categories=categories, tags=tags)
 
+def build_polish_prompt(payload):
+    return f"""
+    你是一名资深的心理学编辑。请根据标题《{payload['title']}》创作一篇专业的心理指南。
+    要求：
+    1. 风格：治愈、专业、易懂。
+    2. 输出格式必须为 JSON，包含：
+       - summary: 100字以内的摘要。
+       - content: Markdown格式的正文，包含背景、建议和练习。
+    请直接输出 JSON，不要包含 ```json 标签。
+    """
+
+def parse_polish_result(text):
+    # 摘要缺失时留空，正文必须存在
+    result = parse_guide(text, required=('content',))
+    return {"summary": result['summary'], "content": result['content']}
+
+# AI 润色改为后台任务：请求只负责入队，由后台线程流式调用模型，前端通过 SSE 跟踪（或轮询）结果
+ai_jobs.register('polish', build_polish_prompt, parse_polish_result, stream_fields=('summary', 'content'))
+
+def _job_response(job):
+    data = {"status": job.status, "job_id": job.id}
+    if job.status == 'done':
+        data.update(job.result or {})
+    elif job.status == 'failed':
+        data["message"] = job.error
+    return data
+
 @guides_bp.route('/ai-polish', methods=['POST'])
 @login_required
 @admin_required
 def ai_polish():
-    data = request.json
+    data = request.json or {}
     title = data.get('title')
     
     if not title:
         return {"status": "error", "message": "请先输入标题"}, 400
 
-    prompt = f"""
-    你是一名资深的心理学编辑。请根据标题《{title}》创作一篇专业的心理指南。
-    要求：
-    1. 风格：治愈、专业、易懂。
-    2. 输出格式必须为 JSON，包含：
-       - summary: 100字以内的摘要。
-       - content: Markdown格式的正文，包含背景、建议和练习。
-    请直接输出 JSON，不要包含 ```json 标签。
-    """
-    
-    try:
-        response = model.generate_content(prompt)
-        # 1. 使用正则表达式从 AI 的回答中提取第一个 { 到最后一个 } 之间的内容
-        # 这样即使 AI 返回了额外的解释文字，也能准确拿到 JSON 块
-        match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        
-        if match:
-            raw_text = match.group()
-            
-            # 2. 关键修复：设置 strict=False
-            # 这允许 json 库解析包含原生换行符和制表符的“不规范”JSON 字符串
-            result = json.loads(raw_text, strict=False)
-            
-            return {
-                "status": "success", 
-                "summary": result.get('summary', ''), 
-                "content": result.get('content', '')
-            }
+    # 相同标题已有生成结果时直接返回（force=true 时重新生成）
+    job = ai_jobs.submit('polish', {'title': title}, user_id=current_user.id, force=bool(data.get('force')))
+    return _job_response(job), (200 if job.status in FINISHED else 202)
+
+@guides_bp.route('/ai-jobs/<string:job_id>')
+@login_required
+@admin_required
+def ai_job_status(job_id):
+    job = ai_jobs.get(job_id)
+    if not job:
+        return {"status": "error", "message": "任务不存在"}, 404
+    return _job_response(job)
+
+@guides_bp.route('/ai-jobs/<string:job_id>/stream')
+@login_required
+@admin_required
+def ai_job_stream(job_id):
+    # 以 server-sent events 推送任务已生成的摘要和正文增量；这里只读取任务行，模型调用在后台线程中进行
+    def generate():
+        # 先推一条注释，让代理和浏览器立刻建立连接
+        yield ": start\n\n"
+        for field, delta in ai_jobs.follow(job_id):
+            yield sse_event('delta', {"field": field, "text": delta})
+        job = ai_jobs.get(job_id)
+        if job is None:
+            yield sse_event('error', {"message": "任务不存在"})
+        elif job.status in FINISHED:
+            yield sse_event(job.status, _job_response(job))
         else:
-            return {"status": "error", "message": "AI 返回的内容格式不正确"}, 500
-            
-    except Exception as e:
-        # 打印错误到终端方便调试
-        print(f"AI 解析错误详情: {str(e)}")
-        return {"status": "error", "message": str(e)}, 500
\ No newline at end of file
+            yield sse_event('error', {"message": "任务执行超时"})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@guides_bp.route('/ai-jobs/<string:job_id>/cancel', methods=['POST'])
+@login_required
+@admin_required
+def cancel_ai_job(job_id):
+    if not ai_jobs.cancel(job_id):
+        return {"status": "error", "message": "任务已结束，无法取消"}, 409
+    return {"status": "cancelled", "job_id": job_id}
@@ -2,11 +2,23 @@
 from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required
 from . import admin_required
-from utils.oss_helper import OssHelper
+from utils.clients import get_oss_helper
+from utils import material_index
 
 # 这里的第一个参数 'admin_materials' 决定了 url_for 的中间段
 materials_bp = Blueprint('admin_materials', __name__, url_prefix='/materials')
-oss_helper = OssHelper()
+
+# 这里的 folder_map 必须与你之前修正后的 OSS 目录一致
+FOLDER_MAP = {
+    'video': 'video/',
+    'audio': 'audio/',
+    'image': 'images/',
+    'material': 'material/'
+}
+
+# 服务端中转大文件时的上传进度：{upload_id: {'consumed': 已上传字节, 'total': 总字节, 'done': 是否完成}}
+# 仅保存在当前进程中，供同一 worker 上的进度查询接口读取
+upload_progress = {}
 
 @materials_bp.route('/')
 @login_required
@@ -19,10 +31,40 @@ def material_center():
 @login_required
 @admin_required
 def get_materials(media_type):
-    folder_map = {'video': 'video/', 'audio': 'audio/', 'material': 'material/', 'image': 'images/'}
-    prefix = folder_map.get(media_type, 'images/')
-    files = oss_helper.list_files(prefix=prefix)
-    return jsonify({'success': True, 'files': files})
+    # 从素材索引表分页读取，不再每次遍历整个 OSS 目录
+    prefix = FOLDER_MAP.get(media_type, 'images/')
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 50, type=int), 200)
+
+    helper = get_oss_helper()
+    if material_index.needs_initial_sync(prefix):
+        # 该目录首次使用：先从 OSS 完整同步一次（之后只在手动对账或 flask materials reconcile 时同步）
+        material_index.reconcile(helper, [prefix])
+
+    query = material_index.search(
+        prefix,
+        keyword=request.args.get('q', '').strip(),
+        content_type=request.args.get('content_type', '').strip(),
+        sort=request.args.get('sort', 'last_modified'),
+        order=request.args.get('order', 'desc')
+    )
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    return jsonify({
+        'success': True,
+        'files': [material_index.to_dict(m, helper) for m in pagination.items],
+        'page': pagination.page,
+        'pages': pagination.pages,
+        'total': pagination.total
+    })
+
+@materials_bp.route('/api/reconcile', methods=['POST'])
+@login_required
+@admin_required
+def reconcile_materials():
+    # 手动与 OSS 对账（在控制台外增删过文件时使用）
+    prefix = FOLDER_MAP.get((request.get_json() or {}).get('type'), 'images/')
+    added, updated, removed = material_index.reconcile(get_oss_helper(), [prefix])
+    return jsonify({'success': True, 'added': added, 'updated': updated, 'removed': removed})
 
 @materials_bp.route('/api/upload', methods=['POST'])
 @login_required
@@ -30,26 +72,72 @@ def get_materials(media_type):
 def upload_material_api():
     file = request.files.get('file')
     media_type = request.form.get('type') # 获取当前所在分类（video/audio/image/material）
+    upload_id = request.form.get('upload_id') # 可选：前端生成的上传 ID，用于查询进度
     
     if not file:
         return jsonify({'success': False, 'message': '未选择文件'})
 
-    # 这里的 folder_map 必须与你之前修正后的 OSS 目录一致
-    folder_map = {
-        'video': 'video/',
-        'audio': 'audio/',
-        'image': 'images/',
-        'material': 'material/'
-    }
-    target_folder = folder_map.get(media_type, 'material/')
+    target_folder = FOLDER_MAP.get(media_type, 'material/')
+
+    progress_callback = None
+    if upload_id:
+        upload_progress[upload_id] = {'consumed': 0, 'total': 0, 'done': False}
+        def progress_callback(consumed, total):
+            upload_progress[upload_id] = {'consumed': consumed, 'total': total or 0, 'done': False}
 
     try:
         # 调用你已经完善好的 oss_helper 上传逻辑
-        # 它会自动处理 Content-Type 和 Cache-Control
-        file_url = oss_helper.upload_file(file, folder=target_folder)
+        # 它会自动处理 Content-Type 和 Cache-Control，大文件自动改为分片并行上传
+        helper = get_oss_helper()
+        file_url = helper.upload_file(file, folder=target_folder, progress_callback=progress_callback)
+        oss_path = file_url[len(helper.public_url('')):]
+        # 以 OSS 上的实际元信息登记（修改时间与列举结果一致，对账时不会被当成已变化）
+        material_index.record(**helper.get_object_info(oss_path))
         return jsonify({'success': True, 'url': file_url})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
+    finally:
+        upload_progress.pop(upload_id, None)
+
+@materials_bp.route('/api/upload/progress/<string:upload_id>')
+@login_required
+@admin_required
+def upload_progress_api(upload_id):
+    # 查询服务端中转上传到 OSS 的进度
+    progress = upload_progress.get(upload_id)
+    if not progress:
+        return jsonify({'success': True, 'done': True})
+    percent = int(progress['consumed'] * 100 / progress['total']) if progress['total'] else 0
+    return jsonify({'success': True, 'done': False, 'percent': percent, **progress})
+
+@materials_bp.route('/api/upload/policy', methods=['POST'])
+@login_required
+@admin_required
+def upload_policy_api():
+    # 浏览器直传：签发一次性的 PostObject 策略，文件字节直接从浏览器发往 OSS
+    data = request.get_json() or {}
+    filename = data.get('filename', '')
+    if '.' not in filename:
+        return jsonify({'success': False, 'message': '文件名缺少扩展名'})
+
+    target_folder = FOLDER_MAP.get(data.get('type'), 'material/')
+    policy = get_oss_helper().build_post_policy(filename, target_folder)
+    return jsonify({'success': True, **policy})
+
+@materials_bp.route('/api/upload/complete', methods=['POST'])
+@login_required
+@admin_required
+def upload_complete_api():
+    # 浏览器直传成功后回调：读取对象元信息并登记到素材索引
+    oss_path = (request.get_json() or {}).get('path', '')
+    if oss_path.split('/', 1)[0] + '/' not in FOLDER_MAP.values():
+        return jsonify({'success': False, 'message': '无效的文件路径'})
+    try:
+        info = get_oss_helper().get_object_info(oss_path)
+        material_index.record(**info)
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
 
 @materials_bp.route('/api/delete', methods=['POST'])
 @login_required
@@ -64,7 +152,8 @@ def delete_material():
 
     try:
         # 执行删除
-        oss_helper.delete_file(oss_path)
+        get_oss_helper().delete_file(oss_path)
+        material_index.remove([oss_path])
         return jsonify({'success': True, 'message': '文件已永久删除'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -81,7 +170,8 @@ def delete_materials():
         return jsonify({'success': False, 'message': '未选择任何文件'})
 
     try:
-        oss_helper.delete_files(oss_paths)
+        get_oss_helper().delete_files(oss_paths)
+        material_index.remove(oss_paths)
         return jsonify({'success': True, 'message': f'成功删除 {len(oss_paths)} 个素材'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
\ No newline at end of file
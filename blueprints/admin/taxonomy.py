@@ -3,6 +3,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required
 from extensions import db
 from models import Category, Tag, GuideContent
+from utils.taxonomy_cache import taxonomy_cache
 from . import admin_required
 
 taxonomy_bp = Blueprint('admin_taxonomy', __name__, url_prefix='/taxonomy')
@@ -25,6 +26,7 @@ def add_category():
         new_cat = Category(name=name, sort_order=0)
         db.session.add(new_cat)
         db.session.commit()
+        taxonomy_cache.bump()
         flash(f'分类 "{name}" 已创建', 'success')
     return redirect(url_for('admin.admin_taxonomy.list_taxonomy'))
 
@@ -63,6 +65,7 @@ def delete_category(id):
     # 5. 执行物理删除
     db.session.delete(cat_to_delete)
     db.session.commit()
+    taxonomy_cache.bump()
     
     return redirect(url_for('admin.admin_taxonomy.list_taxonomy'))
 
@@ -76,6 +79,7 @@ def add_tag():
         new_tag = Tag(name=name)
         db.session.add(new_tag)
         db.session.commit()
+        taxonomy_cache.bump()
         flash(f'标签 "#{name}" 已创建', 'success')
     return redirect(url_for('admin.admin_taxonomy.list_taxonomy'))
 
@@ -86,5 +90,6 @@ def delete_tag(id):
     tag = Tag.query.get_or_404(id)
     db.session.delete(tag)
     db.session.commit()
+    taxonomy_cache.bump()
     flash('标签已移除', 'warning')
     return redirect(url_for('admin.admin_taxonomy.list_taxonomy'))
\ No newline at end of file
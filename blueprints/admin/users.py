@@ -2,6 +2,9 @@
 from flask import Blueprint, render_template, request, jsonify
 from models import User, db
 from flask_login import login_required
+from utils.pagination import paginate_cached
+from utils.user_cache import user_cache
+from utils.export import stream_export, export_format
 from . import admin_required
 users_bp = Blueprint('admin_users', __name__, url_prefix='/users')
 
@@ -11,7 +14,7 @@ users_bp = Blueprint('admin_users', __name__, url_prefix='/users')
 def list_users():
     # 实现你要求的分页返回
     page = request.args.get('page', 1, type=int)
-    pagination = User.query.filter_by(is_admin=False).order_by(User.id.desc()).paginate(page=page, per_page=10)
+    pagination = paginate_cached(User.query.filter_by(is_admin=False).order_by(User.id.desc()), page=page, per_page=10)
     return render_template('admin/users/list.html', users=pagination.items, pagination=pagination)
 
 @users_bp.route('/authorize/<int:user_id>', methods=['POST'])
@@ -22,4 +25,30 @@ def authorize(user_id):
     user = User.query.get_or_404(user_id)
     user.is_paid = not user.is_paid
     db.session.commit()
-    return jsonify({"success": True, "is_paid": user.is_paid})
\ No newline at end of file
+    # 让该用户下一个请求立即拿到新的付费状态
+    user_cache.invalidate(user.id)
+    return jsonify({"success": True, "is_paid": user.is_paid})
+
+@users_bp.route('/export')
+@login_required
+@admin_required
+def export_users():
+    """流式导出用户列表（?format=csv|ndjson），不含密码哈希"""
+    query = db.session.query(
+        User.id, User.phone, User.username, User.email, User.gender, User.identity,
+        User.is_paid, User.is_admin, User.created_at, User.last_login
+    ).order_by(User.id)
+    yes_no = lambda flag: '是' if flag else '否'
+    columns = [
+        ('id', 'ID', None),
+        ('phone', '手机号', None),
+        ('username', '昵称', None),
+        ('email', '邮箱', None),
+        ('gender', '性别', None),
+        ('identity', '身份', None),
+        ('is_paid', '付费用户', yes_no),
+        ('is_admin', '管理员', yes_no),
+        ('created_at', '注册时间', None),
+        ('last_login', '最后登录', None),
+    ]
+    return stream_export(query, columns, 'users', fmt=export_format())
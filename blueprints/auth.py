@@ -1,10 +1,12 @@
 # blueprints/auth.py
 from flask import Blueprint, render_template, redirect, url_for, request, flash, session
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, login_required
 from extensions import db
 from models import User, ActivationCode
 from datetime import datetime, timezone
+from utils.user_cache import user_cache
+from utils.passwords import password_hasher, PasswordHasherBusy
+from utils.rate_limit import rate_limiter, client_ip
 import re
 
 # 定义蓝图
@@ -21,15 +23,28 @@ def register():
     return render_template('activate.html') # 对应 image_57fa65.jpg 的样式
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@rate_limiter.limit(
+    ('login_ip', client_ip),
+    ('login_phone', lambda: request.form.get('phone')),
+    template='login.html'
+)
 def login():
     if request.method == 'POST':
         phone = request.form.get('phone')
         password = request.form.get('password')
         user = User.query.filter_by(phone=phone).first()
-        if user and check_password_hash(user.password_hash, password):
+        try:
+            # 校验成功且哈希参数已调整时，会顺带把 password_hash 升级为新参数
+            verified = password_hasher.verify_and_update(user, password)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'warning')
+            return render_template('login.html'), 503
+        if verified:
             login_user(user)
             user.last_login = datetime.now(timezone.utc)
             db.session.commit() # --- 新增逻辑：更新最后登录时间 ---
+            # 重新登录时丢弃旧快照，从数据库取一次最新状态
+            user_cache.invalidate(user.id)
             return redirect(url_for('content.index'))
         flash('登录失败，请检查手机号或密码', 'danger')
     return render_template('login.html')
@@ -42,6 +57,11 @@ def logout():
 
 # ---验证激活码 ---
 @auth_bp.route('/activate', methods=['GET', 'POST'])
+@rate_limiter.limit(
+    ('activate_ip', client_ip),
+    alarms=[('activate_all', lambda: 'all')],
+    template='activate.html'
+)
 def activate():
     if request.method == 'POST':
         input_code = request.form.get('activation_code')
@@ -75,14 +95,16 @@ def register_account():
             return redirect(request.url)
         
         # 2. 检查手机号是否已被注册
-        if User.query.filter_by(phone=phone).first():
+        existing = User.query.filter_by(phone=phone).first()
+        if existing:
             # 将用户的is_paid变成true
-            User.query.filter_by(phone=phone).first().is_paid = True
+            existing.is_paid = True
             # 标记激活码为已使用
             code_entry = ActivationCode.query.filter_by(code=valid_code).first()
             code_entry.is_used = True
-            code_entry.used_by_username = User.query.filter_by(phone=phone).first().username
+            code_entry.used_by_username = existing.username
             db.session.commit()
+            user_cache.invalidate(existing.id)
             session.pop('valid_code') # 注册完清除 session
             flash('该手机号已被注册，账号已激活，请直接登录', 'warning')
             return redirect(url_for('auth.login'))
@@ -91,7 +113,7 @@ def register_account():
         new_user = User(
             phone=phone,
             username=username, 
-            password_hash=generate_password_hash(password),
+            password_hash=password_hasher.hash(password),
             is_paid=True # 拿到码注册的直接就是付费用户
         )
         
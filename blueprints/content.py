@@ -1,13 +1,19 @@
 # blueprints/content.py 首页指南内容控制
-import re, markdown
 from flask import Blueprint, render_template, request
 from flask_login import login_required, current_user
-from models import Category, Tag, GuideContent
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from models import Tag, GuideContent, user_likes, user_favorites
 from extensions import db
 from flask import Blueprint, render_template
-from utils.oss_helper import OssHelper
-
-oss_helper = OssHelper()
+from utils.clients import get_oss_helper
+from utils.render_cache import guide_render_cache, render_markdown
+from utils.view_counter import view_counter
+from utils.taxonomy_cache import taxonomy_cache
+from utils.search import get_search_backend
+from utils.pagination import paginate_cached, keyset_paginate, encode_cursor
+from utils.related import sample_related, related_refresher
+from utils.images import cover_src
 
 # 定义蓝图
 content_bp = Blueprint('content', __name__)
@@ -31,11 +37,22 @@ def list_guides():
     tag_id = request.args.get('tag_id', type=int)
     search_q = request.args.get('q', '')
 
-    query = GuideContent.query.filter_by(is_published=True)
+    # 分类和标签随主查询一起加载，卡片上的 guide.category.name 不再逐条查询
+    query = GuideContent.query.filter_by(is_published=True).options(
+        joinedload(GuideContent.category),
+        selectinload(GuideContent.tags)
+    )
 
-    # 逻辑过滤保持不变
+    # 全文检索：标题、摘要、正文和标签名都参与匹配，并按相关度排序
+    search_rank = None
     if search_q:
-        query = query.filter(GuideContent.title.contains(search_q) | GuideContent.summary.contains(search_q))
+        search_backend = get_search_backend()
+        if search_backend.available():
+            search_rank = search_backend.rank_subquery(search_q)
+            query = query.join(search_rank, search_rank.c.guide_id == GuideContent.id)
+        else:
+            # 还没有执行检索表迁移时，退回原来的 LIKE 查询
+            query = query.filter(GuideContent.title.contains(search_q) | GuideContent.summary.contains(search_q))
     if cat_id:
         query = query.filter_by(category_id=cat_id)
     if tag_id:
@@ -43,11 +60,23 @@ def list_guides():
 
     # --- 核心修改：使用 paginate 代替 all() ---
     # per_page 设置为每页显示的条数，例如 6 条（配合瀑布流布局）
-    pagination = query.order_by(GuideContent.created_at.desc()).paginate(page=page, per_page=10)
+    if search_rank is not None:
+        query = query.order_by(search_rank.c.rank.desc(), GuideContent.created_at.desc())
+    else:
+        query = query.order_by(GuideContent.created_at.desc(), GuideContent.id.desc())
+    # 总数走缓存，翻页时不再每次都额外执行 COUNT(*)
+    pagination = paginate_cached(query, page=page, per_page=10)
     guides = pagination.items  # 当前页的数据对象列表
 
-    categories = Category.query.order_by(Category.sort_order.asc()).all()
-    tags = Tag.query.all()
+    # 非搜索的首页开启瀑布流无限滚动：后续批次通过 /guides/feed 按游标加载
+    next_cursor = None
+    if search_rank is None and page == 1 and pagination.has_next and guides:
+        next_cursor = encode_cursor([guides[-1].created_at, guides[-1].id])
+
+    # 分类和标签走内存缓存，不再每次请求都查询
+    taxonomy = taxonomy_cache.get()
+    categories = taxonomy.categories
+    tags = taxonomy.tags
 
     return render_template('content/list.html', 
                             guides=guides, 
@@ -56,7 +85,31 @@ def list_guides():
                             tags=tags,
                             current_cat=cat_id,
                             current_tag=tag_id,
-                            search_q=search_q)
+                            search_q=search_q,
+                            next_cursor=next_cursor)
+
+@content_bp.route('/guides/feed')
+@login_required
+def guide_feed():
+    # 瀑布流加载更多：按 (created_at, id) 游标翻页，不做 OFFSET 和 COUNT(*)
+    if not current_user.is_paid:
+        return {"status": "error", "message": "no permission"}, 403
+
+    cat_id = request.args.get('category_id', type=int)
+    tag_id = request.args.get('tag_id', type=int)
+    query = GuideContent.query.filter_by(is_published=True).options(
+        joinedload(GuideContent.category),
+        selectinload(GuideContent.tags)
+    )
+    if cat_id:
+        query = query.filter_by(category_id=cat_id)
+    if tag_id:
+        query = query.join(GuideContent.tags).filter(Tag.id == tag_id)
+
+    feed = keyset_paginate(query, [GuideContent.created_at, GuideContent.id],
+                           cursor=request.args.get('cursor'), per_page=10)
+    html = render_template('content/_guide_cards.html', guides=feed.items)
+    return {"status": "success", "html": html, "next_cursor": feed.next_cursor}
 
 @content_bp.route('/guide/<int:guide_id>')
 @login_required
@@ -72,73 +125,123 @@ def show_guide(guide_id):
     if not current_user.is_paid:
         return render_template('no_permission.html', guide=guide)
 
-    # 阅读数自增
-    guide.view_count += 1
-    db.session.commit()
+    # 阅读数自增：先在内存里累加，每隔几秒批量写回数据库（见 utils/view_counter.py）
+    view_counter.incr(guide.id)
 
-    # 1. 修复正则匹配 Bug：防止把引号 " 或括号 ) 匹配进 URL
-    domain = f"{oss_helper.bucket_name}.{oss_helper.endpoint.replace('https://', '').replace('http://', '')}"
-    # 修改点：在 [^...] 中增加了 \" 和 \'，确保匹配到引号就停止
-    oss_pattern = rf"https?://{re.escape(domain)}/[^\s\)\?\"']+"
-    
-    def sign_match(match):
-        raw_url = match.group(0)
-        return oss_helper.get_signed_url(raw_url)
-
-    # 先进行签名替换
-    signed_content = re.sub(oss_pattern, sign_match, guide.content)
-
-    # 2. 将 Markdown 转换为 HTML
-    # 增加 extensions 以支持表格、代码块等高级语法
-    html_content = markdown.markdown(signed_content, extensions=[
-        'fenced_code', 
-        'tables', 
-        'nl2br',  # 自动换行
-        'toc'     # 自动生成目录（可选）
-    ])
-
-    # 3. 处理封面签名
-    signed_cover = oss_helper.get_signed_url(guide.cover_image_url)
-
-    related_guides = GuideContent.query.filter(
-        GuideContent.category_id == guide.category_id,
-        GuideContent.id != guide_id,
-        GuideContent.is_published == True
-    ).order_by(db.func.random()).limit(3).all()
+    oss_helper = get_oss_helper()
+
+    # 1. 将 Markdown 转换为 HTML（按 guide.id + updated_at 缓存，只有后台保存后才会重新渲染）
+    # 渲染前先把 OSS 链接换成占位链接，缓存里不会出现带时效的签名
+    html_content = guide_render_cache.get_or_render(
+        guide, lambda text: render_markdown(oss_helper.to_placeholders(text))
+    )
+
+    # 2. 响应时一次性把占位链接替换为签名链接（签名按对象缓存，大部分有效期内复用）
+    html_content = oss_helper.sign_placeholders(html_content)
+
+    # 3. 处理封面签名（优先使用 1200px 宽的 WebP 大图，没有时退回原图）
+    signed_cover = oss_helper.get_signed_url(cover_src(guide, 'hero'))
+
+    has_liked = db.session.query(
+        user_likes.select().where(
+            user_likes.c.user_id == current_user.id,
+            user_likes.c.guide_id == guide.id
+        ).exists()
+    ).scalar()
+
+    # 从预先计算好的相关推荐索引中抽取，不再对整个分类做 ORDER BY random()
+    related_guides = sample_related(guide, k=3)
     
     return render_template('content/detail.html', 
                             guide=guide, 
                             content=html_content, # 传出转换后的 HTML
                             cover=signed_cover,
+                            view_count=(guide.view_count or 0) + view_counter.pending_for(guide.id),
+                            has_liked=has_liked,
+                            is_favorited=current_user.has_favorited(guide.id),
                             related_guides=related_guides)
 
 @content_bp.route('/like/<int:guide_id>', methods=['POST'])
 @login_required
 def like_guide(guide_id):
     guide = GuideContent.query.get_or_404(guide_id)
-    guide.like_count += 1
-    db.session.commit()
-    return {"status": "success", "new_count": guide.like_count} # 返回 JSON 给前端
+
+    # 1. 写入点赞关系，联合主键保证同一用户只能点赞一次
+    already_liked = db.session.query(
+        user_likes.select().where(
+            user_likes.c.user_id == current_user.id,
+            user_likes.c.guide_id == guide.id
+        ).exists()
+    ).scalar()
+
+    if not already_liked:
+        try:
+            db.session.execute(user_likes.insert().values(user_id=current_user.id, guide_id=guide.id))
+            # 2. 计数在 SQL 中原子 +1，避免并发点赞互相覆盖（保持 updated_at 不变）
+            GuideContent.query.filter_by(id=guide.id).update({
+                GuideContent.like_count: db.func.coalesce(GuideContent.like_count, 0) + 1,
+                GuideContent.updated_at: GuideContent.updated_at
+            }, synchronize_session=False)
+            db.session.commit()
+        except IntegrityError:
+            # 并发的重复点赞：主键冲突说明已经点过了
+            db.session.rollback()
+
+    new_count = db.session.query(GuideContent.like_count).filter_by(id=guide.id).scalar()
+    return {"status": "success", "new_count": new_count, "liked": True} # 返回 JSON 给前端
+
+@content_bp.route('/likes/state')
+@login_required
+def like_state():
+    # 一次查询返回一整页指南的点赞数和当前用户的点赞状态，如 /likes/state?ids=1,2,3
+    ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip().isdigit()][:100]
+    if not ids:
+        return {"status": "success", "data": {}}
+
+    rows = db.session.query(
+        GuideContent.id, GuideContent.like_count, user_likes.c.user_id
+    ).outerjoin(
+        user_likes,
+        (user_likes.c.guide_id == GuideContent.id) & (user_likes.c.user_id == current_user.id)
+    ).filter(GuideContent.id.in_(ids)).all()
+
+    data = {
+        str(guide_id): {"count": like_count or 0, "liked": liker is not None}
+        for guide_id, like_count, liker in rows
+    }
+    return {"status": "success", "data": data}
 
 @content_bp.route('/favorite/<int:guide_id>', methods=['POST'])
 @login_required
 def toggle_favorite(guide_id):
     guide = GuideContent.query.get_or_404(guide_id)
     
-    # 检查当前用户是否已经收藏过
-    if guide in current_user.favorite_guides:
-        current_user.favorite_guides.remove(guide)
+    # 检查当前用户是否已经收藏过（EXISTS 查询，不加载整个收藏列表）
+    if current_user.has_favorited(guide.id):
+        db.session.execute(user_favorites.delete().where(
+            user_favorites.c.user_id == current_user.id,
+            user_favorites.c.guide_id == guide.id
+        ))
         status = "unfavorited"
     else:
-        current_user.favorite_guides.append(guide)
+        db.session.execute(user_favorites.insert().values(user_id=current_user.id, guide_id=guide.id))
         status = "favorited"
     
     db.session.commit()
+    # 共同收藏是推荐信号之一：只标记这篇指南，由后台线程定期重算它的推荐列表
+    related_refresher.mark_dirty(guide.id)
     return {"status": "success", "action": status}
 
 @content_bp.route('/my/favorites')
 @login_required
 def my_favorites():
-    # 获取当前用户的所有收藏，并按时间排序（如果需要更复杂的排序需增加中间表字段）
-    guides = current_user.favorite_guides
-    return render_template('content/list.html', guides=guides, is_favorite_page=True)
\ No newline at end of file
+    # 收藏列表分页显示，分类和标签随查询一起加载（需要按收藏时间排序时可在中间表增加字段）
+    page = request.args.get('page', 1, type=int)
+    pagination = paginate_cached(current_user.favorites_query(), page=page, per_page=10, error_out=False)
+    return render_template('content/list.html',
+                            guides=pagination.items,
+                            pagination=pagination,
+                            current_cat=None,
+                            current_tag=None,
+                            search_q=None,
+                            is_favorite_page=True)
@@ -10,9 +10,11 @@ main_bp = Blueprint('main', __name__)
 @main_bp.route('/profile')
 @login_required
 def profile():
-    # 获取用户收藏的指南（SQLAlchemy 会自动处理中间表查询）
-    favorites = current_user.favorite_guides
-    return render_template('profile.html', favorites=favorites)
+    # 个人主页只展示最近的收藏，完整列表见“我的收藏”分页页面
+    favorites_query = current_user.favorites_query()
+    favorites = favorites_query.limit(6).all()
+    favorite_total = favorites_query.order_by(None).count()
+    return render_template('profile.html', favorites=favorites, favorite_total=favorite_total)
 
 @main_bp.route('/feedback', methods=['GET', 'POST'])
 @login_required
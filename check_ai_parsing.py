@@ -0,0 +1,102 @@
+# check_ai_parsing.py 模型输出解析检查
+# 用典型的模型输出（含各种格式问题）检查 utils/ai_parsing 能否解析，
+# 再对样本做随机截断/插入字符的模糊测试（只允许抛出 AiResponseError），最后统计解析耗时。
+# 用法：python check_ai_parsing.py [--fuzz 5000] [--samples-dir 目录]
+# --samples-dir 可指定一个目录，目录下每个 .txt 文件是一次真实的模型原始输出，会与内置样本一起检查。
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from utils.ai_parsing import parse_guide, parse_json_object, AiResponseError
+
+_BODY = "## 为什么会焦虑？\n\n焦虑是身体的{警报系统}。\n\n- 练习 1：4-7-8 呼吸\n- 练习 2：写下 \"担忧清单\"\n"
+
+# 线上见过的几类输出：(说明, 原始输出)
+BUILTIN_SAMPLES = [
+    ("标准 JSON", json.dumps({'title': '🌿 与焦虑和解', 'summary': '简介', 'content': _BODY}, ensure_ascii=False)),
+    ("```json 代码块包裹", "```json\n" + json.dumps({'title': 't', 'summary': 's', 'content': _BODY}, ensure_ascii=False) + "\n```"),
+    ("前后带说明文字", "好的，以下是为你生成的内容：\n" + json.dumps({'title': 't', 'summary': 's', 'content': _BODY}) + "\n希望对你有帮助 {😊}"),
+    ("字符串内含原始换行", '{"title": "t", "summary": "s", "content": "第一段\n\n第二段"}'),
+    ("结尾多余逗号", '{"title": "t", "summary": "s", "content": "c", "tags": ["焦虑", "睡眠",],}'),
+    ("输出被截断在正文中", '{"title": "t", "summary": "s", "content": "## 小标题\\n正文写到一半'),
+    ("输出被截断在键名处", '{"title": "t", "summary": "s", "content": "c", "refer'),
+    ("带 BOM 和零宽字符", '﻿{"title": "t​", "summary": "s", "content": "c"}'),
+]
+
+
+def load_samples(samples_dir):
+    samples = list(BUILTIN_SAMPLES)
+    if samples_dir:
+        for name in sorted(os.listdir(samples_dir)):
+            if name.endswith('.txt'):
+                with open(os.path.join(samples_dir, name), encoding='utf-8') as f:
+                    samples.append((name, f.read()))
+    return samples
+
+
+def check_samples(samples):
+    failed = 0
+    for label, raw in samples:
+        try:
+            result = parse_guide(raw, required=('content',))
+            print(f"✅ {label}: {result['title'][:20]!r} / {len(result['content'])} 字")
+        except AiResponseError as e:
+            failed += 1
+            print(f"❌ {label}: {e}")
+    return failed
+
+
+def fuzz(samples, rounds, seed=0):
+    """随机截断、插入结构字符，解析只能成功或抛出 AiResponseError"""
+    rng = random.Random(seed)
+    unparsable = 0
+    for _ in range(rounds):
+        raw = rng.choice(samples)[1]
+        raw = raw[:rng.randint(0, len(raw))]
+        for _ in range(rng.randint(0, 3)):
+            pos = rng.randint(0, len(raw))
+            raw = raw[:pos] + rng.choice('{}[],"\\:') + raw[pos:]
+        try:
+            parse_json_object(raw)
+        except AiResponseError:
+            unparsable += 1
+    return unparsable
+
+
+def benchmark(repeat=50):
+    """长正文（约 100KB，含大量大括号）下的单次解析耗时（毫秒）"""
+    raw = "说明文字 " + json.dumps({'title': 't', 'summary': 's', 'content': _BODY * 1500}, ensure_ascii=False) + " {尾注}"
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_guide(raw)
+    return (time.perf_counter() - start) * 1000 / repeat, len(raw)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查模型输出解析的健壮性与耗时')
+    parser.add_argument('--fuzz', type=int, default=5000, help='模糊测试轮数')
+    parser.add_argument('--samples-dir', help='真实模型输出样本目录（每个 .txt 一份）')
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples_dir)
+    failed = check_samples(samples)
+
+    try:
+        unparsable = fuzz(samples, args.fuzz)
+        print(f"模糊测试 {args.fuzz} 轮：{unparsable} 轮无法解析（均为 AiResponseError）")
+    except Exception as e:
+        print(f"❌ 模糊测试中出现了 AiResponseError 以外的异常: {e!r}")
+        failed += 1
+
+    cost_ms, size = benchmark()
+    print(f"{size // 1024} KB 输出解析耗时: {cost_ms:.2f} ms/次")
+
+    if failed:
+        sys.exit(1)
+    print("✅ 解析检查通过")
+
+
+if __name__ == '__main__':
+    main()
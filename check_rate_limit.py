@@ -0,0 +1,136 @@
+# check_rate_limit.py 登录/激活限流检查
+# 1. 用可控时钟模拟突发请求，检查令牌桶的放行数量、恢复速度和 Retry-After；
+# 2. 多线程同时抢同一个桶，放行数量必须恰好等于容量；
+# 3. 用临时 SQLite 库启动应用，对 /login 和 /activate 发起突发请求，检查超限后返回 429 且不再查库，
+#    全站总量只告警不拦截，反向代理之后按 X-Forwarded-For 区分客户端。
+# 用法：python check_rate_limit.py
+import os
+import sys
+import tempfile
+import threading
+from utils.rate_limit import MemoryBackend, parse_limit
+
+failures = []
+
+
+def check(condition, label):
+    print(f"{'✅' if condition else '❌'} {label}")
+    if not condition:
+        failures.append(label)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def check_bucket():
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+    capacity, rate = parse_limit('5/300')
+    results = [backend.take('k', capacity, rate) for _ in range(8)]
+    check(sum(1 for wait in results if wait == 0) == 5, "突发 8 次，容量 5：放行 5 次")
+    check(abs(results[-1] - 60) < 1e-6, f"超限后 Retry-After 为 60 秒（实际 {results[-1]:.1f}）")
+    clock.now += 59
+    check(backend.take('k', capacity, rate) > 0, "59 秒后仍未恢复令牌")
+    clock.now += 1
+    check(backend.take('k', capacity, rate) == 0, "60 秒后恢复 1 个令牌")
+    check(backend.take('other', capacity, rate) == 0, "不同 key 互不影响")
+    clock.now += 10000
+    check(sum(1 for _ in range(8) if backend.take('k', capacity, rate) == 0) == 5, "长时间空闲后最多恢复到容量")
+
+    backend = MemoryBackend(max_keys=100, clock=clock)
+    for i in range(300):
+        # 桶都没有回满，也必须按最近使用淘汰
+        backend.take(f"ip{i}", capacity, rate)
+        backend.take('hot', capacity, rate)
+    check(len(backend._buckets) <= 100, f"桶数量不超过 max_keys（实际 {len(backend._buckets)}）")
+    check('hot' in backend._buckets and 'ip0' not in backend._buckets, "淘汰最久未使用的桶，保留仍在使用的桶")
+
+
+def check_threads():
+    backend = MemoryBackend()
+    allowed = []
+
+    def worker():
+        for _ in range(20):
+            if backend.take('shared', 100, 1e-9) == 0:
+                allowed.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    check(len(allowed) == 100, f"50 个线程并发 1000 次，放行恰好 100 次（实际 {len(allowed)}）")
+
+
+def check_app():
+    db_path = os.path.join(tempfile.mkdtemp(), 'rate_limit_check.db')
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.environ.setdefault('OSS_ACCESS_KEY_ID', 'rate-limit-check')
+    os.environ.setdefault('OSS_ACCESS_KEY_SECRET', 'rate-limit-check')
+    os.environ['AI_JOB_WORKERS'] = '0'
+    from sqlalchemy import event
+    from app import app
+    from extensions import db
+    from utils.rate_limit import rate_limiter
+
+    with app.app_context():
+        db.create_all()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    client = app.test_client()
+
+    rate_limiter.backend.reset()
+    codes = [client.post('/login', data={'phone': '13900000000', 'password': 'x'}).status_code for _ in range(30)]
+    check(codes.count(429) == 25, f"同一手机号突发登录 30 次：25 次返回 429（实际 {codes.count(429)}）")
+
+    rate_limiter.backend.reset()
+    codes = [client.post('/login', data={'phone': f"139{i:08d}", 'password': 'x'}).status_code for i in range(30)]
+    check(codes.count(429) == 10, f"同一 IP 轮换手机号登录 30 次：10 次返回 429（实际 {codes.count(429)}）")
+
+    before = len(statements)
+    response = client.post('/login', data={'phone': '13900000001', 'password': 'x'})
+    check(response.status_code == 429 and len(statements) == before, "被限流的登录请求不查询数据库")
+    check(response.headers.get('Retry-After', '').isdigit(), f"429 响应带 Retry-After（{response.headers.get('Retry-After')}）")
+    check(client.get('/login').status_code == 200, "GET 登录页不受限流影响")
+
+    rate_limiter.backend.reset()
+    codes = [client.post('/activate', data={'activation_code': f"GUESS{i}"}).status_code for i in range(50)]
+    check(codes.count(429) == 40, f"同一 IP 突发猜激活码 50 次：40 次返回 429（实际 {codes.count(429)}）")
+
+    rate_limiter.backend.reset()
+    codes = [
+        client.post('/activate', data={'activation_code': f"GUESS{i}"},
+                    environ_base={'REMOTE_ADDR': f"10.0.{i // 250}.{i % 250}"}).status_code
+        for i in range(200)
+    ]
+    # 全站总量只告警：换 IP 猜码不能把正常用户一起挡在外面
+    check(codes.count(429) == 0, f"200 个 IP 各猜一次：全站总量只告警不拦截（实际 429 共 {codes.count(429)} 次）")
+
+    # 反向代理之后：所有请求的 remote_addr 都是代理地址，按 X-Forwarded-For 区分客户端
+    rate_limiter.backend.reset()
+    proxy = {'REMOTE_ADDR': '10.255.0.1'}
+    codes = [
+        client.post('/activate', data={'activation_code': f"GUESS{i}"}, environ_base=proxy,
+                    headers={'X-Forwarded-For': f"203.0.113.{i % 2}"}).status_code
+        for i in range(40)
+    ]
+    check(codes.count(429) == 20, f"代理后两个客户端各猜 20 次：各自放行 10 次（实际 429 共 {codes.count(429)} 次）")
+
+
+def main():
+    check_bucket()
+    check_threads()
+    check_app()
+    if failures:
+        sys.exit(1)
+    print("✅ 限流检查通过")
+
+
+if __name__ == '__main__':
+    main()
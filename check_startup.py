@@ -0,0 +1,72 @@
+# check_startup.py 启动耗时检查
+# 用 python -X importtime 统计 `import app` 的耗时，超出预算或重型依赖被提前导入时以非 0 状态退出。
+# 用法：python check_startup.py [--budget-ms 800] [--runs 5]
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+# 这些依赖应当在第一次使用时才导入（见 utils/clients.py）
+LAZY_MODULES = ['google.generativeai', 'grpc', 'oss2']
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def measure_once():
+    """返回 (app 累计耗时微秒, {app 的直接依赖: 累计耗时微秒}, 本次导入的全部模块名)"""
+    env = dict(os.environ)
+    # 只为完成导入，不会真正连接 OSS
+    env.setdefault('OSS_ACCESS_KEY_ID', 'startup-check')
+    env.setdefault('OSS_ACCESS_KEY_SECRET', 'startup-check')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"导入 app 失败:\n{result.stderr[-2000:]}")
+
+    app_us, children, modules = 0, {}, set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        modules.add(name)
+        # importtime 每嵌套一层多缩进两个空格，子模块的行出现在父模块之前
+        if len(indent) == 1 and name == 'app':
+            app_us = int(cumulative)
+        elif len(indent) == 3:
+            children[name] = int(cumulative)
+    return app_us, children, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查 app 的启动导入耗时')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', 800)))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    app_ms = statistics.median(r[0] for r in runs) / 1000
+
+    print(f"import app 耗时（{args.runs} 次中位数）: {app_ms:.1f} ms，预算 {args.budget_ms:.0f} ms")
+    print("app 直接导入中耗时最多的模块：")
+    slowest = sorted(runs[-1][1].items(), key=lambda kv: kv[1], reverse=True)[:10]
+    for name, cumulative in slowest:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    eager = [m for m in LAZY_MODULES if m in runs[-1][2]]
+    if eager:
+        print(f"❌ 以下模块应当延迟导入，却在启动时被导入了: {', '.join(eager)}")
+    if app_ms > args.budget_ms:
+        print("❌ 启动耗时超出预算")
+    if eager or app_ms > args.budget_ms:
+        sys.exit(1)
+    print("✅ 启动耗时在预算内")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+# commands.py 运维命令（flask <group> <command>）
+import os
+import re
+import time
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, func, text
+from extensions import db
+from models import GuideContent, Tag, ActivationCode, User, Feedback, AiUsage, user_likes
+from utils.view_counter import view_counter
+from utils.search import get_search_backend
+from utils import related, material_index
+from utils.images import update_cover_variants
+from utils.ai_jobs import ai_jobs
+from utils.ai_gateway import tokens_used_today
+from utils.clients import get_oss_helper, wrap_ai_model
+from utils.passwords import PasswordHasher, password_hasher
+from utils.activation_codes import generate_codes, CODE_LENGTH, MIN_CODE_LENGTH, MAX_CODE_LENGTH
+
+views_cli = AppGroup('views', help='阅读数缓冲相关命令')
+likes_cli = AppGroup('likes', help='点赞计数相关命令')
+search_cli = AppGroup('search', help='全文检索相关命令')
+indexes_cli = AppGroup('indexes', help='数据库索引相关命令')
+related_cli = AppGroup('related', help='相关推荐索引相关命令')
+materials_cli = AppGroup('materials', help='素材索引相关命令')
+covers_cli = AppGroup('covers', help='封面衍生图相关命令')
+seed_cli = AppGroup('seed', help='AI 内容批量生成相关命令')
+ai_jobs_cli = AppGroup('ai-jobs', help='AI 后台任务相关命令')
+ai_usage_cli = AppGroup('ai-usage', help='AI 调用用量相关命令')
+passwords_cli = AppGroup('passwords', help='密码哈希相关命令')
+codes_cli = AppGroup('codes', help='激活码相关命令')
+
+
+@views_cli.command('flush')
+def flush_views():
+    """把阅读数缓冲和本地积压日志写回数据库（部署/停机前执行）"""
+    replayed = view_counter.replay_log()
+    flushed = view_counter.flush()
+    click.echo(f"已写回：本地日志 {replayed} 篇指南，内存缓冲 {flushed} 篇指南")
+
+
+@likes_cli.command('reconcile')
+def reconcile_likes():
+    """以 user_likes 关系表为准，重新校准所有指南的 like_count"""
+    like_total = (
+        select(func.count())
+        .where(user_likes.c.guide_id == GuideContent.id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        GuideContent.__table__.update().values(
+            like_count=like_total,
+            updated_at=GuideContent.__table__.c.updated_at
+        )
+    )
+    db.session.commit()
+    click.echo(f"已校准 {result.rowcount} 篇指南的点赞数")
+
+
+@search_cli.command('reindex')
+def reindex_search():
+    """创建检索表（如不存在）并重建全部指南的检索数据"""
+    backend = get_search_backend()
+    backend.create_schema()
+    count = backend.reindex_all()
+    click.echo(f"已重建 {count} 篇指南的检索数据")
+
+
+@related_cli.command('rebuild')
+def rebuild_related():
+    """全量重建所有已发布指南的相关推荐列表"""
+    count = related.rebuild_all()
+    click.echo(f"已重建 {count} 篇指南的相关推荐")
+
+
+@materials_cli.command('reconcile')
+@click.option('--prefix', multiple=True, help='只对账指定目录，可重复；默认全部素材目录')
+def reconcile_materials(prefix):
+    """与 OSS 对账素材索引（建议用 cron 定期执行）"""
+    from blueprints.admin.materials import FOLDER_MAP
+    prefixes = prefix or list(FOLDER_MAP.values())
+    added, updated, removed = material_index.reconcile(get_oss_helper(), prefixes)
+    click.echo(f"素材索引已对账：新增 {added}，更新 {updated}，删除 {removed}")
+
+
+@covers_cli.command('rebuild')
+@click.option('--all', 'rebuild_all', is_flag=True, help='重新生成全部指南（默认只补齐还没有衍生图的指南）')
+def rebuild_covers(rebuild_all):
+    """为指南封面生成缩略图/卡片/大图衍生图"""
+    helper = get_oss_helper()
+    query = GuideContent.query.filter(GuideContent.cover_image_url.isnot(None))
+    if not rebuild_all:
+        query = query.filter(GuideContent.cover_variants.is_(None))
+    done = 0
+    for (guide_id,) in query.with_entities(GuideContent.id).all():
+        if update_cover_variants(helper, guide_id):
+            done += 1
+    click.echo(f"已为 {done} 篇指南生成封面衍生图")
+
+
+@seed_cli.command('batch')
+@click.option('--category', 'categories', multiple=True, required=True, help='分类名，可重复')
+@click.option('--tag', 'tags', multiple=True, required=True, help='标签名，可重复')
+@click.option('--count', default=1, show_default=True, help='每个 分类 × 标签 组合生成的篇数')
+@click.option('--workers', default=8, show_default=True, help='并发请求数')
+@click.option('--rate', default=5.0, show_default=True, help='每秒最多发起的模型调用数')
+@click.option('--chunk-size', default=20, show_default=True, help='每批提交的篇数')
+@click.option('--checkpoint', default=None, help='断点文件路径（默认 instance/seed_checkpoint.txt）')
+@click.option('--fake', is_flag=True, help='使用离线假模型演练，不调用 Gemini')
+def seed_batch(categories, tags, count, workers, rate, chunk_size, checkpoint, fake):
+    """按 分类 × 标签 × 篇数 并发生成指南，中断后重新执行会从断点继续"""
+    import ai_seeder
+    created, failed, _ = ai_seeder.seed_batch(
+        categories, tags, count, workers=workers, rate=rate, chunk_size=chunk_size,
+        model=wrap_ai_model(ai_seeder.FakeModel()) if fake else None, checkpoint_path=checkpoint, log=click.echo
+    )
+    if created:
+        # 新指南会进入其他指南的相似列表，全量重建
+        count = related.rebuild_all()
+        click.echo(f"已重建 {count} 篇指南的相关推荐")
+    if failed:
+        raise click.ClickException(f"{failed} 篇生成失败，重新执行同一命令即可续跑")
+
+
+@ai_jobs_cli.command('work')
+@click.option('--once', is_flag=True, help='执行完当前排队的任务后退出')
+def work_ai_jobs(once):
+    """在独立进程中执行 AI 后台任务（web 进程设置 AI_JOB_WORKERS=0 时使用）"""
+    while True:
+        count = ai_jobs.run_pending()
+        if count:
+            click.echo(f"已执行 {count} 个 AI 任务")
+        if once:
+            return
+        time.sleep(ai_jobs.poll_interval)
+
+
+@ai_usage_cli.command('report')
+@click.option('--days', default=7, show_default=True, help='统计最近几天（UTC）')
+def report_ai_usage(days):
+    """按天汇总 AI 调用次数、缓存命中、token 用量和耗时"""
+    since = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    billed = AiUsage.cached.is_(False)
+    day = func.date(AiUsage.created_at)
+    rows = db.session.query(
+        day,
+        func.count(),
+        func.sum(db.case((AiUsage.cached.is_(True), 1), else_=0)),
+        func.sum(db.case((AiUsage.ok.is_(False), 1), else_=0)),
+        func.sum(db.case((billed, AiUsage.prompt_tokens), else_=0)),
+        func.sum(db.case((billed, AiUsage.output_tokens), else_=0)),
+        func.avg(db.case((billed, AiUsage.latency_ms))),
+        func.avg(AiUsage.first_token_ms),
+    ).filter(AiUsage.created_at >= since).group_by(day).order_by(day).all()
+
+    click.echo(f"{'日期':<12}{'调用':>6}{'缓存命中':>10}{'失败':>6}{'输入 tokens':>14}{'输出 tokens':>14}{'平均耗时':>10}{'首段耗时':>10}")
+    for date, calls, hits, errors, prompt_tokens, output_tokens, latency, first_token in rows:
+        click.echo(f"{str(date):<12}{calls:>6}{hits or 0:>10}{errors or 0:>6}{prompt_tokens or 0:>14}"
+                   f"{output_tokens or 0:>14}{int(latency or 0):>8}ms{int(first_token or 0):>8}ms")
+
+    budget = current_app.config.get('AI_DAILY_TOKEN_BUDGET', 0)
+    used = tokens_used_today()
+    click.echo(f"今日已用 {used} tokens" + (f"，预算 {budget}（{used * 100 // budget}%）" if budget else "，未设置预算"))
+
+
+
+@passwords_cli.command('benchmark')
+@click.option('--method', 'methods', multiple=True, help='要比较的哈希参数，可多次指定；默认为当前配置')
+@click.option('--seconds', default=5.0, show_default=True, help='每组参数的压测时长')
+@click.option('--workers', type=int, help='哈希线程数，默认与 PASSWORD_HASH_WORKERS 相同')
+@click.option('--concurrency', type=int, help='模拟同时登录的请求数，默认为线程数的 4 倍')
+def benchmark_passwords(methods, seconds, workers, concurrency):
+    """压测登录时的密码校验：每秒可处理的登录数（总量与每核）及排队后的耗时"""
+    workers = workers or password_hasher.workers
+    concurrency = concurrency or workers * 4
+    cores = min(workers, os.cpu_count() or 1)
+    click.echo(f"CPU 核数 {os.cpu_count()}，哈希线程 {workers}，并发请求 {concurrency}，每组 {seconds:g} 秒")
+    click.echo(f"{'参数':<28}{'单次耗时':>10}{'登录/秒':>10}{'每核/秒':>10}{'平均耗时':>10}{'P95':>10}")
+    for method in methods or (password_hasher.method,):
+        hasher = PasswordHasher(method=method, workers=workers, max_pending=concurrency)
+        stored = hasher.hash('benchmark-password')
+        started = time.perf_counter()
+        hasher.verify(stored, 'benchmark-password')
+        single = time.perf_counter() - started
+
+        latencies = []
+        deadline = time.perf_counter() + seconds
+
+        def login_loop():
+            while time.perf_counter() < deadline:
+                t = time.perf_counter()
+                hasher.verify(stored, 'benchmark-password')
+                latencies.append(time.perf_counter() - t)
+
+        threads = [threading.Thread(target=login_loop) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        rate = len(latencies) / elapsed
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        click.echo(f"{hasher.method_prefix():<28}{single * 1000:>8.1f}ms{rate:>10.1f}{rate / cores:>10.1f}"
+                   f"{sum(latencies) / max(len(latencies), 1) * 1000:>8.1f}ms{p95 * 1000:>8.1f}ms")
+    click.echo("提示：通过 PASSWORD_HASH_METHOD 调整参数后，老用户会在下次登录时自动升级哈希")
+
+
+@codes_cli.command('generate')
+@click.option('--count', type=int, required=True, help='生成数量')
+@click.option('--batch-id', help='批次号，默认按时间自动生成')
+@click.option('--length', default=CODE_LENGTH, show_default=True,
+              type=click.IntRange(MIN_CODE_LENGTH, MAX_CODE_LENGTH), help='激活码长度')
+def generate_activation_codes(count, batch_id, length):
+    """批量生成激活码（合作活动一次几十万个），完成后可在后台按批次导出 CSV"""
+    started = time.monotonic()
+    try:
+        batch_id, created = generate_codes(
+            count, batch_id=batch_id, length=length,
+            log=lambda done, total: click.echo(f"  已生成 {done}/{total}")
+        )
+    except RuntimeError as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+    click.echo(f"✅ 批次 {batch_id}：生成 {created} 个激活码，耗时 {time.monotonic() - started:.1f} 秒")
+
+
+def _hot_queries():
+    """各路由的主查询，与蓝图中的写法保持一致"""
+    published = GuideContent.query.filter_by(is_published=True)
+    return {
+        'content.list_guides': published.order_by(
+            GuideContent.created_at.desc(), GuideContent.id.desc()).limit(10),
+        'content.list_guides?category_id': published.filter_by(category_id=1).order_by(
+            GuideContent.created_at.desc(), GuideContent.id.desc()).limit(10),
+        'content.list_guides?tag_id': published.join(GuideContent.tags).filter(Tag.id == 1).order_by(
+            GuideContent.created_at.desc(), GuideContent.id.desc()).limit(10),
+        'admin_guides.manage_guides': GuideContent.query.order_by(
+            GuideContent.updated_at.desc(), GuideContent.id.desc()).limit(10),
+        'auth.activate': ActivationCode.query.filter_by(code='ABCDEFGH', is_used=False),
+        'admin_codes.get_available_codes': ActivationCode.query.filter_by(is_used=False).order_by(
+            ActivationCode.id),
+        'admin_users.list_users': User.query.filter_by(is_admin=False).order_by(User.id.desc()).limit(10),
+        'admin_feedback.list_feedback': Feedback.query.order_by(
+            Feedback.created_at.desc(), Feedback.id.desc()).limit(10),
+        'admin_materials.get_materials': material_index.search('video/').limit(50),
+    }
+
+
+def _uses_full_scan(query):
+    """返回 (是否存在全表扫描, 执行计划文本)"""
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    if db.engine.dialect.name == 'postgresql':
+        # 小表上 Postgres 总是倾向顺序扫描，这里禁用它，只检查“能否”走索引
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+        plan = [row[0] for row in db.session.execute(text('EXPLAIN ' + sql))]
+        db.session.rollback()
+        return any('Seq Scan' in line for line in plan), plan
+    plan = [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+    return any(line.startswith('SCAN') and 'USING' not in line for line in plan), plan
+
+
+def _search_plan(query_text):
+    """
+    content.list_guides 搜索时的查询是否走全文索引
+    :return: (是否走全文索引, 执行计划文本)
+    """
+    backend = get_search_backend()
+    if not backend.available():
+        return False, ['检索表不存在，请先执行 flask search reindex']
+    rank = backend.rank_subquery(query_text)
+    query = GuideContent.query.filter_by(is_published=True).join(
+        rank, rank.c.guide_id == GuideContent.id
+    ).order_by(rank.c.rank.desc(), GuideContent.created_at.desc()).limit(10)
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+        plan = [row[0] for row in db.session.execute(text('EXPLAIN ' + sql))]
+        db.session.rollback()
+        return any(f'ix_{backend.table_name}_document' in line for line in plan), plan
+    plan = [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+    # FTS5 的 MATCH 条件由虚拟表自身的倒排索引处理，计划中显示为 VIRTUAL TABLE INDEX n:M...
+    return any(re.search(rf'{backend.table_name} VIRTUAL TABLE INDEX \d+:M', line) for line in plan), plan
+
+
+@indexes_cli.command('check')
+def check_indexes():
+    """检查各路由主查询的执行计划，存在全表扫描或搜索未走全文索引时以非 0 状态退出"""
+    failed = []
+    for name, query in _hot_queries().items():
+        full_scan, plan = _uses_full_scan(query)
+        click.echo(f"{'❌' if full_scan else '✅'} {name}")
+        for line in plan:
+            click.echo(f"    {line}")
+        if full_scan:
+            failed.append(name)
+    for query_text in ('焦虑', '焦'):
+        name = f'content.list_guides?q={query_text}'
+        uses_index, plan = _search_plan(query_text)
+        click.echo(f"{'✅' if uses_index else '❌'} {name}")
+        for line in plan:
+            click.echo(f"    {line}")
+        if not uses_index:
+            failed.append(name)
+    if failed:
+        raise click.ClickException(f"以下查询没有走索引: {', '.join(failed)}")
+
+
+def register_commands(app):
+    app.cli.add_command(views_cli)
+    app.cli.add_command(likes_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(indexes_cli)
+    app.cli.add_command(related_cli)
+    app.cli.add_command(materials_cli)
+    app.cli.add_command(covers_cli)
+    app.cli.add_command(seed_cli)
+    app.cli.add_command(ai_jobs_cli)
+    app.cli.add_command(ai_usage_cli)
+    app.cli.add_command(passwords_cli)
+    app.cli.add_command(codes_cli)
@@ -1,6 +1,6 @@
 # init_online.py
 from app import app, db, User
-from werkzeug.security import generate_password_hash
+from utils.passwords import password_hasher
 
 def run_init():
     # 核心：必须使用 with 语句进入应用上下文
@@ -15,7 +15,7 @@ def run_init():
             admin = User(
                 phone='18888888888', # 别忘了填上手机号，否则会报 Null 错误
                 username='toohoo',
-                password_hash=generate_password_hash('你的密码'),
+                password_hash=password_hasher.hash('你的密码'),
                 is_admin=True,
                 is_paid=True
             )
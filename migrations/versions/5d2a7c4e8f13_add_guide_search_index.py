@@ -0,0 +1,37 @@
+"""add guide_search full-text index
+
+Revision ID: 5d2a7c4e8f13
+Revises: 3c8e1f5a9b27
+Create Date: 2026-10-18 11:03:47.581920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a7c4e8f13'
+down_revision = '3c8e1f5a9b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 检索表的结构依赖数据库类型，与 utils/search.py 中的后端保持一致
+    # 建表后执行 `flask search reindex` 导入已有指南
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE TABLE guide_search ("
+            "guide_id INTEGER PRIMARY KEY REFERENCES guide_content(id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX ix_guide_search_document ON guide_search USING GIN (document)")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE guide_search "
+            "USING fts5(title, summary, body, tags, tokenize='unicode61')"
+        )
+
+
+def downgrade():
+    op.execute("DROP TABLE guide_search")
@@ -2,7 +2,6 @@
 from extensions import db
 from flask_login import UserMixin
 from datetime import datetime, timezone
-from extensions import login_manager
 import uuid
 
 # 定义收藏中间表
@@ -11,6 +10,13 @@ user_favorites = db.Table('user_favorites',
     db.Column('guide_id', db.Integer, db.ForeignKey('guide_content.id'), primary_key=True)
 )
 
+# 定义点赞中间表：联合主键保证同一用户对同一指南只能点赞一次
+user_likes = db.Table('user_likes',
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
+    db.Column('guide_id', db.Integer, db.ForeignKey('guide_content.id'), primary_key=True),
+    db.Column('created_at', db.DateTime, default=datetime.utcnow)
+)
+
 # --- 1. 用户模型 (包含 CRUD 基础) ---
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -29,13 +35,34 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     # PM 建议：记录最后登录时间，帮你判断用户活跃度
     last_login = db.Column(db.DateTime, onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # 后台用户列表：WHERE is_admin = false ORDER BY id DESC
+        db.Index('ix_user_is_admin_id', 'is_admin', 'id'),
+    )
     favorite_guides = db.relationship('GuideContent', 
                                       secondary=user_favorites, 
                                       backref=db.backref('favorited_by', lazy='dynamic'))
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+    def favorites_query(self):
+        """当前用户收藏的指南查询：一次性带出分类和标签，模板里遍历时不会逐条触发查询"""
+        return GuideContent.query.join(
+            user_favorites, user_favorites.c.guide_id == GuideContent.id
+        ).filter(
+            user_favorites.c.user_id == self.id
+        ).options(
+            db.joinedload(GuideContent.category),
+            db.selectinload(GuideContent.tags)
+        ).order_by(GuideContent.id.desc())
+
+    def has_favorited(self, guide_id):
+        """用 EXISTS 判断是否已收藏，避免为一次判断加载整个收藏列表"""
+        return db.session.query(
+            user_favorites.select().where(
+                user_favorites.c.user_id == self.id,
+                user_favorites.c.guide_id == guide_id
+            ).exists()
+        ).scalar()
 
 # 新增激活码模型
 class ActivationCode(db.Model):
@@ -44,6 +71,15 @@ class ActivationCode(db.Model):
     is_used = db.Column(db.Boolean, default=False) # 是否已被使用
     used_by_username = db.Column(db.String(80), nullable=True) # 被哪个用户使用了（方便追溯）
     created_at = db.Column(db.DateTime, default=db.func.now()) # 创建时间：方便你管理库存
+    batch_id = db.Column(db.String(32), nullable=True) # 生成批次：同一次批量生成的码共用，便于按合作活动导出
+
+    __table_args__ = (
+        # 激活校验按 code 查找，code 列的唯一索引已经覆盖，不再单独建索引
+        # 导出/复制可用激活码：WHERE is_used = false ORDER BY id
+        db.Index('ix_activation_code_is_used_id', 'is_used', 'id'),
+        # 按批次导出/查看：WHERE batch_id = ? ORDER BY id
+        db.Index('ix_activation_code_batch_id_id', 'batch_id', 'id'),
+    )
 
 # 分类模型：用于导航和内容过滤
 class Category(db.Model):
@@ -64,7 +100,9 @@ class Category(db.Model):
 # 关联表：连接指导内容和标签 (多对多)
 guide_tags = db.Table('guide_tags',
     db.Column('guide_id', db.Integer, db.ForeignKey('guide_content.id'), primary_key=True),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
+    # 按标签筛选指南时走这个反向索引（主键只能按 guide_id 开头查找）
+    db.Index('ix_guide_tags_tag_guide', 'tag_id', 'guide_id')
 )
 
 # 标签模型
@@ -92,6 +130,7 @@ class GuideContent(db.Model):
     # 多媒体资源
     icon_url = db.Column(db.String(255)) # 缩略图
     cover_image_url = db.Column(db.String(255)) # 内容详情页顶部大图
+    cover_variants = db.Column(db.JSON(none_as_null=True)) # 封面衍生图 {'thumb': url, 'card': url, 'hero': url}，见 utils/images.py
     audio_url = db.Column(db.String(255)) # 冥想音频/语音导读链接
     video_url = db.Column(db.String(255)) # 心理科普或练习视频链接
     
@@ -106,9 +145,31 @@ class GuideContent(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) # 最后更新时间
 
+    __table_args__ = (
+        # 指南库首页/瀑布流：WHERE is_published ORDER BY created_at DESC, id DESC
+        db.Index('ix_guide_content_published_created', 'is_published', 'created_at', 'id'),
+        # 按分类筛选：WHERE is_published AND category_id = ? ORDER BY created_at DESC, id DESC
+        db.Index('ix_guide_content_published_category_created', 'is_published', 'category_id', 'created_at', 'id'),
+        # 后台指南管理：ORDER BY updated_at DESC, id DESC
+        db.Index('ix_guide_content_updated', 'updated_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<GuideContent {self.title}>'
 
+# 相关推荐索引：离线计算每篇指南的 Top-N 相似指南，详情页直接读取
+class GuideRelated(db.Model):
+    __tablename__ = 'guide_related'
+    guide_id = db.Column(db.Integer, db.ForeignKey('guide_content.id'), primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey('guide_content.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False, default=0) # 综合得分：同分类 + 共同标签 + 共同收藏
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # 保存指南时反查“哪些指南把它列为相似指南”：WHERE related_id = ?
+        db.Index('ix_guide_related_related_id', 'related_id'),
+    )
+
 class Feedback(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     # 反馈内容
@@ -122,4 +183,81 @@ class Feedback(db.Model):
     user = db.relationship('User', backref=db.backref('feedbacks', lazy=True))
 
     # 状态：0-未处理，1-已采纳，2-已回复
-    status = db.Column(db.Integer, default=0)
\ No newline at end of file
+    status = db.Column(db.Integer, default=0)
+
+    __table_args__ = (
+        # 后台反馈列表：ORDER BY created_at DESC, id DESC
+        db.Index('ix_feedback_created', 'created_at', 'id'),
+    )
+
+# 素材索引：OSS 对象的本地镜像，素材中心的列表/排序/搜索都查这张表，不再每次遍历 OSS
+class MaterialObject(db.Model):
+    __tablename__ = 'material_object'
+    key = db.Column(db.String(512), primary_key=True) # OSS 完整路径，如 video/xxx.mp4
+    folder = db.Column(db.String(64), nullable=False) # 所属目录，如 video/
+    name = db.Column(db.String(255), nullable=False) # 去掉目录后的文件名，用于搜索
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    content_type = db.Column(db.String(100))
+    last_modified = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # 最近一次对账时在 OSS 上看到它的时间
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # 素材列表：WHERE folder = ? ORDER BY last_modified DESC / size DESC
+        db.Index('ix_material_object_folder_modified', 'folder', 'last_modified', 'key'),
+        db.Index('ix_material_object_folder_size', 'folder', 'size', 'key'),
+    )
+
+
+# 已与 OSS 完整对账过的素材目录：目录为空时也能据此判断不需要再次全量同步
+class MaterialFolder(db.Model):
+    __tablename__ = 'material_folder'
+    folder = db.Column(db.String(64), primary_key=True) # 如 video/
+    synced_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # 最近一次完整对账的时间
+
+
+# AI 后台任务：耗时的模型调用放到后台线程执行，前端轮询任务状态，见 utils/ai_jobs.py
+class AiJob(db.Model):
+    __tablename__ = 'ai_job'
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    kind = db.Column(db.String(32), nullable=False) # 任务类型，如 polish
+    prompt_hash = db.Column(db.String(64), nullable=False) # 提示词哈希，相同提示词直接复用已完成的结果
+    payload = db.Column(db.JSON) # 任务参数，如 {'title': ...}
+    # 状态：pending-排队中，running-执行中，done-已完成，failed-失败，cancelled-已取消
+    status = db.Column(db.String(16), nullable=False, default='pending')
+    result = db.Column(db.JSON)
+    # 流式任务执行中已生成的部分字段，如 {'summary': ..., 'content': ...}，编辑器据此逐步显示
+    progress = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # 工作线程领取任务：WHERE status = 'pending' ORDER BY created_at
+        db.Index('ix_ai_job_status_created', 'status', 'created_at'),
+        # 结果缓存：WHERE prompt_hash = ? AND status = 'done'
+        db.Index('ix_ai_job_prompt_hash_status', 'prompt_hash', 'status'),
+    )
+
+
+# AI 调用记录：每次模型调用（含缓存命中）一行，用于统计耗时、token 用量和每日预算，见 utils/ai_gateway.py
+class AiUsage(db.Model):
+    __tablename__ = 'ai_usage'
+    id = db.Column(db.Integer, primary_key=True)
+    model = db.Column(db.String(64), nullable=False)
+    prompt_hash = db.Column(db.String(64), nullable=False)
+    prompt_tokens = db.Column(db.Integer, default=0)
+    output_tokens = db.Column(db.Integer, default=0)
+    latency_ms = db.Column(db.Integer, default=0) # 总耗时
+    first_token_ms = db.Column(db.Integer) # 流式调用收到第一段的耗时
+    cached = db.Column(db.Boolean, default=False) # 是否命中磁盘缓存（命中时不计入预算）
+    ok = db.Column(db.Boolean, default=True)
+    error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # 当日预算与用量报表：WHERE created_at >= ?
+        db.Index('ix_ai_usage_created', 'created_at'),
+    )
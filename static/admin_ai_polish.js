@@ -0,0 +1,117 @@
+// static/admin_ai_polish.js 指南编辑页的 AI 一键润色（新增页和编辑页共用）
+// 点击按钮后提交后台任务：支持 EventSource 的浏览器通过 SSE 跟踪任务，摘要和正文随模型输出逐步填入编辑器；
+// 不支持时轮询任务状态。生成期间再次点击按钮可取消。
+// 页面需先定义 AI_POLISH_URL（提交任务）和 AI_JOB_URL（任务状态，任务 ID 处为 __id__）。
+let aiJobId = null;
+let aiPollTimer = null;
+let aiStream = null;
+
+function resetAiButton(btn) {
+    clearTimeout(aiPollTimer);
+    aiJobId = null;
+    if (aiStream) {
+        aiStream.close();
+        aiStream = null;
+    }
+    btn.innerHTML = btn.dataset.originalText;
+    btn.classList.remove('active');
+}
+
+function handleAiResult(btn, data) {
+    if (data.status === 'done') {
+        // 自动填充摘要和正文
+        document.querySelector('textarea[name="summary"]').value = data.summary;
+        document.querySelector('textarea[name="content"]').value = data.content;
+        resetAiButton(btn);
+        alert("✨ AI 创作完成！已自动填入摘要和正文。");
+    } else if (data.status === 'pending' || data.status === 'running') {
+        aiJobId = data.job_id;
+        if (window.EventSource && !aiStream) {
+            followAiJob(btn);
+        } else {
+            aiPollTimer = setTimeout(() => pollAiJob(btn), 2000);
+        }
+    } else if (data.status === 'cancelled') {
+        resetAiButton(btn);
+    } else {
+        resetAiButton(btn);
+        alert("AI 暂时掉线了: " + data.message);
+    }
+}
+
+function pollAiJob(btn) {
+    fetch(AI_JOB_URL.replace('__id__', aiJobId))
+    .then(res => res.json())
+    .then(data => handleAiResult(btn, data))
+    .catch(() => { aiPollTimer = setTimeout(() => pollAiJob(btn), 5000); });
+}
+
+// 跟踪后台任务的流式输出
+function followAiJob(btn) {
+    const summaryBox = document.querySelector('textarea[name="summary"]');
+    const contentBox = document.querySelector('textarea[name="content"]');
+    const boxes = { summary: summaryBox, content: contentBox };
+    let started = false;
+
+    aiStream = new EventSource(AI_JOB_URL.replace('__id__', aiJobId) + '/stream');
+    aiStream.addEventListener('delta', e => {
+        const data = JSON.parse(e.data);
+        if (!started) {
+            // 收到第一段内容时才清空旧内容
+            summaryBox.value = '';
+            contentBox.value = '';
+            started = true;
+        }
+        const box = boxes[data.field];
+        if (box) {
+            box.value += data.text;
+            box.scrollTop = box.scrollHeight;
+        }
+    });
+    ['done', 'failed', 'cancelled'].forEach(name => {
+        aiStream.addEventListener(name, e => handleAiResult(btn, JSON.parse(e.data)));
+    });
+    aiStream.addEventListener('error', e => {
+        if (e.data) {
+            // 服务端推送的错误事件
+            resetAiButton(btn);
+            alert("AI 暂时掉线了: " + JSON.parse(e.data).message);
+            return;
+        }
+        // 连接中断：任务仍在后台执行，改为轮询结果（不让 EventSource 自动重连，避免重复追加已显示的内容）
+        aiStream.close();
+        pollAiJob(btn);
+    });
+}
+
+document.getElementById('ai-btn').onclick = function() {
+    if (aiJobId) {
+        // 正在生成：取消任务
+        fetch(AI_JOB_URL.replace('__id__', aiJobId) + '/cancel', { method: 'POST' });
+        resetAiButton(this);
+        return;
+    }
+
+    const title = document.getElementById('title-input').value;
+    if (!title) {
+        alert("请先输入一个标题，让 AI 知道写什么内容。");
+        return;
+    }
+
+    // 视觉反馈：进入加载状态
+    this.dataset.originalText = this.innerHTML;
+    this.innerHTML = '<span class="spinner-border spinner-border-sm"></span> AI 正在思考中...（点击取消）';
+    this.classList.add('active');
+
+    fetch(AI_POLISH_URL, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ title: title })
+    })
+    .then(res => res.json())
+    .then(data => handleAiResult(this, data))
+    .catch(err => {
+        resetAiButton(this);
+        alert("AI 暂时掉线了: " + err);
+    });
+};
@@ -0,0 +1,95 @@
+# utils/activation_codes.py 激活码批量生成
+# 原来每个候选码先 SELECT 一次确认不重复，遇到重复就少生成一个，一次只能生成 10 个。
+# 这里改为：
+# 1. 用 secrets 取随机字节，按 base32 映射到去掉易混字符（0/O、1/I）的 32 个字符上；
+# 2. 每一块候选码一次往返写入（多行 INSERT ... ON CONFLICT DO NOTHING），与已有码冲突的行由数据库跳过；
+# 3. 按实际写入行数算出冲突了几个，只为这几个重新取码，直到凑满数量；
+# 4. 同一次生成的码带同一个 batch_id，便于按合作活动导出。
+import base64
+import secrets
+from datetime import datetime
+from sqlalchemy import insert
+from extensions import db
+from models import ActivationCode
+
+# 恰好 32 个字符，每个字符对应 5 个随机位，没有取模偏差
+ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+_FROM_BASE32 = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ234567', ALPHABET)
+CODE_LENGTH = 10
+# 码长范围：太短容易被猜中且码空间小，上限为 ActivationCode.code 的列长度
+MIN_CODE_LENGTH = 6
+MAX_CODE_LENGTH = ActivationCode.__table__.c.code.type.length
+# 每块行数，每块提交一次事务
+CHUNK_SIZE = 5000
+# 冲突后重新取码的最大轮数，码长过短、码空间快被占满时避免死循环
+MAX_ROUNDS = 20
+
+
+def random_code(length=CODE_LENGTH):
+    # 一次系统调用取够随机字节，编码和映射都在 C 层完成，生成几十万个码也很快
+    raw = base64.b32encode(secrets.token_bytes(length * 5 // 8 + 1)).decode()
+    return raw[:length].translate(_FROM_BASE32)
+
+
+def new_batch_id():
+    """如 20261018-1912-7F3A9C：生成时间 + 随机后缀"""
+    return f"{datetime.now():%Y%m%d-%H%M}-{secrets.token_hex(3).upper()}"
+
+
+def _insert_ignore(rows):
+    """
+    多行插入，code 已存在的行跳过，返回实际写入行数
+    语句只编译一次，行数据作为参数列表传入，由 SQLAlchemy 展开成多行 VALUES（每条约 1000 行）；
+    把几千行直接拼进 .values() 的话，每块都要重新编译一条超长语句，耗时反而是执行的好几倍
+    """
+    table = ActivationCode.__table__
+    dialect = db.engine.dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        # MySQL 不支持 RETURNING，INSERT IGNORE 的 rowcount 即写入行数
+        return db.session.execute(insert(table).prefix_with('IGNORE'), rows).rowcount
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise RuntimeError(f"不支持的数据库类型: {dialect}")
+    # 冲突被跳过的行不会出现在 RETURNING 中
+    stmt = dialect_insert(table).on_conflict_do_nothing(index_elements=['code']).returning(table.c.code)
+    return len(db.session.execute(stmt, rows).all())
+
+
+def generate_codes(count, batch_id=None, length=CODE_LENGTH, chunk_size=CHUNK_SIZE, log=None):
+    """
+    生成 count 个不重复的激活码，每块提交一次事务
+    :param log: 可选的进度回调，参数为 (已生成数, 总数)
+    :return: (batch_id, 实际生成数)
+    """
+    if not 1 <= length <= MAX_CODE_LENGTH:
+        raise ValueError(f"激活码长度需在 1~{MAX_CODE_LENGTH} 之间")
+    if count > len(ALPHABET) ** length:
+        raise RuntimeError(f"{length} 位激活码最多只有 {len(ALPHABET) ** length} 种，请增加码长")
+    batch_id = batch_id or new_batch_id()
+    created = 0
+    while created < count:
+        size = min(chunk_size, count - created)
+        inserted = 0
+        for _ in range(MAX_ROUNDS):
+            # 块内先用集合去重，块与库之间的冲突交给 ON CONFLICT；
+            # 取码次数有上限，码空间快被占满时这一轮少插几个，由 MAX_ROUNDS 兜底报错
+            needed = size - inserted
+            codes = set()
+            for _ in range(needed * 4):
+                codes.add(random_code(length))
+                if len(codes) == needed:
+                    break
+            rows = [{'code': code, 'is_used': False, 'batch_id': batch_id} for code in codes]
+            inserted += _insert_ignore(rows)
+            if inserted == size:
+                break
+        db.session.commit()
+        created += inserted
+        if inserted < size:
+            raise RuntimeError(f"激活码冲突过多，已生成 {created}/{count} 个，请增加码长后重试")
+        if log:
+            log(created, count)
+    return batch_id, created
@@ -0,0 +1,188 @@
+# utils/ai_gateway.py AI 调用网关
+# 包装 genai.GenerativeModel，对调用方保持同样的 generate_content(prompt, stream=False) 接口，额外提供：
+# 1. 按 (模型, 提示词) 内容寻址的磁盘缓存：相同提示词直接返回上次的输出，不再重复计费；
+# 2. 每次调用记录耗时、首段耗时和 token 用量到 ai_usage 表；
+# 3. 每日 token 预算：当天未命中缓存的用量超出预算后拒绝新的调用。
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from types import SimpleNamespace
+from flask import current_app, has_app_context
+from sqlalchemy import func
+from extensions import db
+from models import AiUsage
+
+_local = threading.local()
+
+
+class AiBudgetExceeded(RuntimeError):
+    """当日 token 用量已达到预算"""
+
+
+@contextmanager
+def bypass_cache():
+    """在这个上下文中的调用不读磁盘缓存（仍会写入），用于“重新生成”"""
+    previous = getattr(_local, 'bypass', False)
+    _local.bypass = True
+    try:
+        yield
+    finally:
+        _local.bypass = previous
+
+
+def tokens_used_today():
+    """当天（UTC）未命中缓存的 token 用量"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return db.session.query(
+        func.coalesce(func.sum(AiUsage.prompt_tokens + AiUsage.output_tokens), 0)
+    ).filter(AiUsage.created_at >= today, AiUsage.cached.is_(False)).scalar()
+
+
+def _estimate_tokens(text):
+    # 拿不到 usage_metadata 时的粗略估算：中文约 1 字 1 token，英文约 4 字符 1 token，取中间值
+    return max(1, len(text or '') // 2)
+
+
+def _usage_of(response, prompt, text):
+    meta = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(meta, 'prompt_token_count', None)
+    output_tokens = getattr(meta, 'candidates_token_count', None)
+    return (prompt_tokens or _estimate_tokens(prompt), output_tokens or _estimate_tokens(text))
+
+
+class AiGateway:
+    """
+    :param model: 具有 generate_content(prompt, stream=False) 方法的模型对象
+    :param cache_dir: 磁盘缓存目录，None 表示不缓存
+    :param cache_ttl: 缓存有效期（秒），0 表示永久
+    :param daily_budget: 每日 token 预算（UTC 自然日），0 表示不限制
+    """
+    def __init__(self, model, cache_dir=None, cache_ttl=0, daily_budget=0):
+        self.model = model
+        self.model_name = getattr(model, 'model_name', type(model).__name__)
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.daily_budget = daily_budget
+        # 批量生成等场景会在工作线程中调用，记录用量时需要重新进入应用上下文
+        self.app = current_app._get_current_object() if has_app_context() else None
+
+    def _app_context(self):
+        if has_app_context() or self.app is None:
+            return nullcontext()
+        return self.app.app_context()
+
+    def generate_content(self, prompt, stream=False):
+        key = hashlib.sha256(f"{self.model_name}\n{prompt}".encode()).hexdigest()
+        cached = None if getattr(_local, 'bypass', False) else self._cache_get(key)
+        if cached is not None:
+            self._record(key, cached=True)
+            if stream:
+                return iter([SimpleNamespace(text=cached)])
+            return SimpleNamespace(text=cached, cached=True)
+
+        self._check_budget()
+        if stream:
+            return self._stream(key, prompt)
+
+        started = time.monotonic()
+        try:
+            response = self.model.generate_content(prompt)
+            text = response.text
+        except Exception as e:
+            self._record(key, latency=time.monotonic() - started, error=e)
+            raise
+        prompt_tokens, output_tokens = _usage_of(response, prompt, text)
+        self._record(key, prompt_tokens, output_tokens, time.monotonic() - started)
+        self._cache_set(key, prompt, text)
+        return response
+
+    def _stream(self, key, prompt):
+        started = time.monotonic()
+        first_token = None
+        parts = []
+        last_chunk = None
+        error = None
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                if first_token is None:
+                    first_token = time.monotonic() - started
+                last_chunk = chunk
+                parts.append(chunk.text or '')
+                yield chunk
+        except GeneratorExit:
+            # 调用方中途放弃（如浏览器关闭了 SSE 连接）
+            error = '调用方取消'
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            text = ''.join(parts)
+            # 流式响应的 usage_metadata 在最后一段上
+            prompt_tokens, output_tokens = _usage_of(last_chunk, prompt, text)
+            self._record(key, prompt_tokens, output_tokens, time.monotonic() - started,
+                         first_token=first_token, error=error)
+            if error is None:
+                self._cache_set(key, prompt, text)
+
+    # --- 预算 ---
+    def _check_budget(self):
+        if not self.daily_budget:
+            return
+        with self._app_context():
+            used = tokens_used_today()
+        if used >= self.daily_budget:
+            raise AiBudgetExceeded(f"今日 AI 用量已达到预算（{self.daily_budget} tokens），请明天再试")
+
+    # --- 用量记录 ---
+    def _record(self, key, prompt_tokens=0, output_tokens=0, latency=0, first_token=None, cached=False, error=None):
+        row = {
+            'model': self.model_name, 'prompt_hash': key,
+            'prompt_tokens': prompt_tokens, 'output_tokens': output_tokens,
+            'latency_ms': int(latency * 1000),
+            'first_token_ms': int(first_token * 1000) if first_token is not None else None,
+            'cached': cached, 'ok': error is None,
+            'error': str(error)[:255] if error is not None else None,
+            'created_at': datetime.utcnow(),
+        }
+        try:
+            # 使用独立连接，不影响调用方的 db.session
+            with self._app_context(), db.engine.begin() as conn:
+                conn.execute(AiUsage.__table__.insert(), row)
+        except Exception as e:
+            print(f"AI 用量记录失败: {e}")
+
+    # --- 磁盘缓存 ---
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _cache_get(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(key)
+        try:
+            if self.cache_ttl and time.time() - os.path.getmtime(path) > self.cache_ttl:
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)['text']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _cache_set(self, key, prompt, text):
+        if not self.cache_dir or not text:
+            return
+        path = self._cache_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，并发写同一个 key 时不会读到半个文件
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'model': self.model_name, 'prompt': prompt, 'text': text,
+                           'created_at': datetime.utcnow().isoformat()}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"AI 缓存写入失败: {e}")
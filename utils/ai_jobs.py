@@ -0,0 +1,277 @@
+# utils/ai_jobs.py AI 后台任务队列
+# 一次 Gemini 调用往往要 20~60 秒，放在请求里同步执行会长时间占住 web worker。
+# 这里把任务写入 ai_job 表，由进程内的后台线程领取执行，前端轮询任务状态。
+# 任务表本身就是队列：多个 worker 进程通过“带条件的 UPDATE”抢占任务，同一任务只会被执行一次。
+# 流式任务边生成边把已解析出的字段写回任务行（progress），SSE 接口只读取这一行推送增量，不占用模型调用时间。
+import os
+import time
+import hashlib
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from sqlalchemy import update, select, or_, and_
+from extensions import db
+from models import AiJob
+from utils.ai_gateway import bypass_cache
+from utils.ai_stream import JsonFieldStream
+
+FINISHED = ('done', 'failed', 'cancelled')
+
+
+class AiJobQueue:
+    """
+    基于数据库表的 AI 任务队列
+    :param workers: 每个进程的后台线程数
+    :param poll_interval: 没有新任务时检查队列的间隔（秒）
+    :param cache_ttl: 相同提示词的结果复用多久（秒）
+    :param job_timeout: 执行超过这个时间（秒）仍未结束的任务视为失败（进程中途退出等情况）
+    :param progress_interval: 流式任务写回部分结果的最短间隔（秒）
+    """
+    def __init__(self, workers=2, poll_interval=2, cache_ttl=7 * 24 * 3600, job_timeout=300, progress_interval=0.5):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.cache_ttl = cache_ttl
+        self.job_timeout = job_timeout
+        self.progress_interval = progress_interval
+        # 返回模型对象的函数，默认使用共享的 Gemini 客户端；测试时可替换为离线假模型
+        self.model_factory = None
+        self._handlers = {}
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get('AI_JOB_WORKERS', self.workers)
+        self.cache_ttl = app.config.get('AI_RESULT_CACHE_TTL', self.cache_ttl)
+        self.job_timeout = app.config.get('AI_JOB_TIMEOUT', self.job_timeout)
+        app.extensions['ai_jobs'] = self
+        if self.workers:
+            # 每个进程收到第一个请求时就启动工作线程，重启前遗留的排队任务不必等到有人提交新任务才执行；
+            # 不在导入时直接启动，避免 gunicorn 主进程和 flask db upgrade 等命令也跑起任务线程
+            app.before_request(self._ensure_workers)
+
+    def register(self, kind, build_prompt, parse, stream_fields=None):
+        """
+        注册任务类型
+        :param build_prompt: payload -> 提示词
+        :param parse: 模型返回的文本 -> 结果 dict（格式不对时抛出异常）
+        :param stream_fields: 流式调用模型，并把 JSON 输出中这些字符串字段的部分内容写入 progress
+        """
+        self._handlers[kind] = (build_prompt, parse, stream_fields)
+
+    def prompt_hash(self, kind, payload):
+        build_prompt = self._handlers[kind][0]
+        return hashlib.sha256(f"{kind}\n{build_prompt(payload)}".encode()).hexdigest()
+
+    def cached(self, kind, payload):
+        """相同提示词在 cache_ttl 内已完成的任务，没有时返回 None"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.cache_ttl)
+        return AiJob.query.filter(
+            AiJob.prompt_hash == self.prompt_hash(kind, payload),
+            AiJob.status == 'done', AiJob.finished_at >= cutoff
+        ).order_by(AiJob.finished_at.desc()).first()
+
+    def submit(self, kind, payload, user_id=None, force=False):
+        """
+        提交任务。相同提示词已有完成的结果（在 cache_ttl 内）或正在排队/执行的任务时直接返回它
+        :param force: 忽略缓存，重新生成
+        :return: AiJob
+        """
+        prompt_hash = self.prompt_hash(kind, payload)
+
+        if not force:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.cache_ttl)
+            existing = AiJob.query.filter(
+                AiJob.prompt_hash == prompt_hash,
+                or_(
+                    and_(AiJob.status == 'done', AiJob.finished_at >= cutoff),
+                    AiJob.status.in_(('pending', 'running'))
+                )
+            ).order_by(AiJob.created_at.desc()).first()
+            if existing:
+                return existing
+
+        if force:
+            # 执行时跳过 AI 网关的磁盘缓存，确保拿到新的输出
+            payload = {**payload, 'force': True}
+        job = AiJob(kind=kind, prompt_hash=prompt_hash, payload=payload, user_id=user_id)
+        db.session.add(job)
+        db.session.commit()
+        self._ensure_workers()
+        self._wakeup.set()
+        return job
+
+    def store(self, kind, payload, result, user_id=None):
+        """把在请求内（流式输出）生成的结果记为已完成的任务，之后相同提示词可直接复用"""
+        now = datetime.utcnow()
+        job = AiJob(kind=kind, prompt_hash=self.prompt_hash(kind, payload), payload=payload,
+                    status='done', result=result, user_id=user_id, started_at=now, finished_at=now)
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def get_model(self):
+        """当前使用的模型对象"""
+        return (self.model_factory or _default_model)()
+
+    def get(self, job_id):
+        return db.session.get(AiJob, job_id)
+
+    def cancel(self, job_id):
+        """取消排队中或执行中的任务；执行中的模型调用无法中断，返回后结果会被丢弃"""
+        result = db.session.execute(
+            update(AiJob.__table__)
+            .where(AiJob.id == job_id, AiJob.status.in_(('pending', 'running')))
+            .values(status='cancelled', finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return result.rowcount > 0
+
+    def follow(self, job_id, interval=0.5):
+        """
+        跟踪任务执行，生成 (字段, 新增文本)，任务结束（或超过 job_timeout）时返回
+        每次用独立的短连接读取任务行：模型调用可能在别的进程中进行，也不长时间占用 db.session 的事务
+        """
+        table = AiJob.__table__
+        sent = {}
+        deadline = time.monotonic() + self.job_timeout
+        while time.monotonic() < deadline:
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    select(table.c.status, table.c.progress).where(table.c.id == job_id)
+                ).first()
+            if row is None:
+                return
+            for field, value in (row.progress or {}).items():
+                done = sent.get(field, 0)
+                if len(value) > done:
+                    yield field, value[done:]
+                    sent[field] = len(value)
+            if row.status in FINISHED:
+                return
+            time.sleep(interval)
+
+    def run_pending(self):
+        """在当前线程中执行完所有排队的任务（命令行与离线测试使用），返回执行数"""
+        count = 0
+        while True:
+            job_id = self._claim()
+            if not job_id:
+                return count
+            self._run(job_id)
+            count += 1
+
+    def _ensure_workers(self):
+        # gunicorn 预加载后 fork 的子进程不会继承线程，按进程号判断是否需要重新启动
+        if self._pid == os.getpid() or not self.workers:
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._worker_loop, name=f'ai-job-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _worker_loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    if self.run_pending():
+                        continue
+            except Exception as e:
+                print(f"AI 任务线程异常: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim(self):
+        """领取一个排队中的任务，返回任务 ID；条件 UPDATE 保证多个线程/进程不会领到同一个任务"""
+        table = AiJob.__table__
+        now = datetime.utcnow()
+        # 顺带把超时未结束的任务标记为失败
+        db.session.execute(
+            update(table)
+            .where(table.c.status == 'running', table.c.started_at < now - timedelta(seconds=self.job_timeout))
+            .values(status='failed', error='任务执行超时', finished_at=now)
+        )
+        candidates = db.session.execute(
+            select(table.c.id).where(table.c.status == 'pending').order_by(table.c.created_at).limit(5)
+        ).scalars().all()
+        for job_id in candidates:
+            claimed = db.session.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.status == 'pending')
+                .values(status='running', started_at=now)
+            ).rowcount
+            if claimed:
+                db.session.commit()
+                return job_id
+        db.session.commit()
+        return None
+
+    def _run(self, job_id):
+        job = db.session.get(AiJob, job_id)
+        build_prompt, parse, stream_fields = self._handlers[job.kind]
+        values = {}
+        try:
+            model = self.get_model()
+            with (bypass_cache() if job.payload.get('force') else nullcontext()):
+                if stream_fields:
+                    result = self._run_streaming(job_id, model, build_prompt(job.payload), parse, stream_fields)
+                else:
+                    result = parse(model.generate_content(build_prompt(job.payload)).text)
+            values.update(status='done', result=result)
+        except Exception as e:
+            print(f"AI 任务 {job_id} 失败: {e}")
+            values.update(status='failed', error=str(e))
+        values['finished_at'] = datetime.utcnow()
+        # 只写回仍处于 running 的任务：执行期间被取消的任务丢弃结果
+        db.session.execute(
+            update(AiJob.__table__)
+            .where(AiJob.id == job_id, AiJob.status == 'running')
+            .values(**values)
+        )
+        db.session.commit()
+
+    def _run_streaming(self, job_id, model, prompt, parse, fields):
+        parser = JsonFieldStream(fields=fields)
+        chunks = []
+        written = time.monotonic()
+        for chunk in model.generate_content(prompt, stream=True):
+            text = chunk.text or ''
+            chunks.append(text)
+            if parser.feed(text) and time.monotonic() - written >= self.progress_interval:
+                if not self._save_progress(job_id, parser.values):
+                    # 任务已被取消，不再继续生成
+                    break
+                written = time.monotonic()
+        # 以完整文本的解析结果为准；模型没按 JSON 输出时用已解析出的字段兜底
+        try:
+            return parse(''.join(chunks))
+        except ValueError:
+            if not parser.values:
+                raise
+            return {field: parser.values.get(field, '') for field in fields}
+
+    def _save_progress(self, job_id, values):
+        """写回部分结果，任务已不在执行中（被取消）时返回 False"""
+        result = db.session.execute(
+            update(AiJob.__table__)
+            .where(AiJob.id == job_id, AiJob.status == 'running')
+            .values(progress=dict(values))
+        )
+        db.session.commit()
+        return result.rowcount > 0
+
+
+def _default_model():
+    from utils.clients import get_ai_model
+    return get_ai_model()
+
+
+ai_jobs = AiJobQueue()
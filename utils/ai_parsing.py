@@ -0,0 +1,145 @@
+# utils/ai_parsing.py 模型结构化输出解析
+# 批量生成（ai_seeder）和后台润色（admin/guides）共用的 JSON 解析：
+# 1. 线性扫描提取第一个完整的 {...}，正确处理字符串里的大括号和转义，不依赖贪婪正则；
+# 2. 直接解析失败时做一次修复（去掉多余逗号、补全被截断的字符串和括号）；
+# 3. 按字段校验并截断到数据库列长度。
+import re
+import json
+
+# 指南的三个字段及对应的列长度（None 表示不截断）
+GUIDE_FIELDS = {'title': 100, 'summary': 255, 'content': None}
+
+# 扫描时的记号：完整的字符串整段跳过（由正则引擎在 C 层完成）、落单的引号（字符串被截断）、结构字符
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|"|[{}\[\],]', re.S)
+# 模型偶尔输出的不可见字符
+_INVISIBLE = re.compile('[\ufeff\u200b\u200c\u200d\u2060]')
+
+
+class AiResponseError(ValueError):
+    """模型返回的内容无法解析为预期的结构"""
+
+
+def _structure(text, start=0):
+    """
+    扫描 text[start:]，找出字符串之外的结构字符
+    :return: ([(位置, 字符), ...], 结尾是否停在字符串内)
+    """
+    events = []
+    for match in _TOKEN.finditer(text, start):
+        token = match.group()
+        if token == '"':
+            # 没有配对的引号：字符串一直延续到文本结尾
+            return events, True
+        if token[0] != '"':
+            events.append((match.start(), token))
+    return events, False
+
+
+def extract_json_object(text):
+    """
+    提取文本中第一个顶层 JSON 对象
+    :return: (对象文本, 是否完整闭合)；输出被截断时返回从 '{' 到结尾的文本
+    """
+    text = _INVISIBLE.sub('', text or '')
+    start = text.find('{')
+    if start < 0:
+        raise AiResponseError("AI 返回的内容中没有 JSON 对象")
+    depth = 0
+    for pos, ch in _structure(text, start)[0]:
+        if ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1], True
+    return text[start:], False
+
+
+def repair_json(obj_text):
+    """
+    修复常见的输出问题：
+    - 对象/数组结尾多余的逗号：{"a": 1,}
+    - 输出被截断：补全未闭合的字符串和括号，必要时丢弃最后一个不完整的成员
+    """
+    events, in_string = _structure(obj_text)
+    out = []
+    last = 0
+    stack = []   # 尚未闭合的括号对应的右括号
+    cuts = []    # 每一层最后一个逗号之前的 out 长度，截断时回退到这里
+    for pos, ch in events:
+        if ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            cuts.append(None)
+        elif ch in '}]':
+            # 去掉紧挨在右括号前的逗号
+            segment = obj_text[last:pos]
+            if segment.rstrip().endswith(','):
+                segment = segment.rstrip()[:-1]
+            out.append(segment)
+            last = pos
+            if stack:
+                stack.pop()
+                cuts.pop()
+        elif ch == ',' and cuts:
+            out.append(obj_text[last:pos])
+            last = pos
+            cuts[-1] = len(out)
+    tail = obj_text[last:]
+    if not stack:
+        return ''.join(out) + tail
+
+    if in_string:
+        # 结尾落在转义符中间（奇数个反斜杠）时去掉最后一个
+        if (len(tail) - len(tail.rstrip('\\'))) % 2:
+            tail = tail[:-1]
+        tail += '"'
+    closing = ''.join(reversed(stack))
+    candidate = ''.join(out) + tail + closing
+    try:
+        json.loads(candidate, strict=False)
+        return candidate
+    except json.JSONDecodeError:
+        pass
+    # 最后一个成员不完整（如只写了键名），回退到该层最后一个逗号之前
+    if cuts[-1] is None:
+        return candidate
+    return ''.join(out[:cuts[-1]]) + closing
+
+
+def parse_json_object(text, allow_truncated=True):
+    """
+    从模型输出中解析出 JSON 对象，必要时先修复
+    :param allow_truncated: 是否接受被截断后补全的对象（批量入库时应拒绝，交给重试）
+    """
+    obj_text, complete = extract_json_object(text)
+    if not complete and not allow_truncated:
+        raise AiResponseError("AI 输出被截断")
+    try:
+        data = json.loads(obj_text, strict=False)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(repair_json(obj_text), strict=False)
+        except json.JSONDecodeError as e:
+            raise AiResponseError(f"AI 返回的 JSON 无法解析: {e}") from e
+    if not isinstance(data, dict):
+        raise AiResponseError("AI 返回的 JSON 不是对象")
+    return data
+
+
+def parse_guide(text, required=tuple(GUIDE_FIELDS), allow_truncated=True):
+    """
+    解析指南结构（title / summary / content）
+    :param required: 必须存在且非空的字段，其余字段缺失时为空字符串
+    :return: 只包含 GUIDE_FIELDS 中字段的 dict，已去除首尾空白并按列长度截断
+    """
+    data = parse_json_object(text, allow_truncated=allow_truncated)
+    result = {}
+    for field, max_length in GUIDE_FIELDS.items():
+        value = data.get(field)
+        if not isinstance(value, str):
+            value = '' if value is None else str(value)
+        value = value.strip()
+        if field in required and not value:
+            raise AiResponseError(f"AI 返回缺少字段: {field}")
+        result[field] = value[:max_length] if max_length else value
+    return result
@@ -0,0 +1,155 @@
+# utils/ai_stream.py 流式输出解析
+# 模型按片段返回 JSON 文本（如 {"summary": "...", "content": "..."}），
+# JsonFieldStream 逐字符解析，字符串字段每收到一段就立即吐出解码后的增量，
+# 编辑器可以边生成边显示，不必等整个 JSON 闭合。
+import json
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', '\\': '\\', '/': '/'}
+
+
+class JsonFieldStream:
+    """
+    增量解析顶层 JSON 对象中的字符串字段
+    只关心第一层的字符串值；嵌套对象/数组和数字等值会被跳过。
+    JSON 之前的说明文字或 ```json 包裹会被忽略；转义序列跨片段时也能正确拼接。
+    :param fields: 只输出这些字段的增量，None 表示全部字符串字段
+    """
+    def __init__(self, fields=None):
+        self.fields = set(fields) if fields else None
+        self.values = {}
+        self._state = 'start'
+        self._depth = 0
+        self._key = ''
+        self._escape = None     # None / '' 表示刚读到反斜杠 / 'uXXXX' 正在读取 \u 转义
+        self._high_surrogate = None
+        self._skip_in_string = False
+        self._skip_escape = False
+
+    def feed(self, text):
+        """输入一段模型输出，返回 [(字段名, 新增文本), ...]"""
+        deltas = []
+        for ch in text:
+            piece = self._step(ch)
+            if piece:
+                if deltas and deltas[-1][0] == self._key:
+                    deltas[-1] = (self._key, deltas[-1][1] + piece)
+                else:
+                    deltas.append((self._key, piece))
+        return deltas
+
+    @property
+    def complete(self):
+        """顶层对象是否已经闭合"""
+        return self._state == 'end'
+
+    def _wanted(self):
+        return self.fields is None or self._key in self.fields
+
+    def _step(self, ch):
+        state = self._state
+        if state == 'start':
+            if ch == '{':
+                self._state = 'key_or_end'
+        elif state == 'key_or_end':
+            if ch == '"':
+                self._key = ''
+                self._state = 'key'
+            elif ch == '}':
+                self._state = 'end'
+        elif state == 'key':
+            if self._escape is not None:
+                self._key += _ESCAPES.get(ch, ch)
+                self._escape = None
+            elif ch == '\\':
+                self._escape = ''
+            elif ch == '"':
+                self._state = 'colon'
+            else:
+                self._key += ch
+        elif state == 'colon':
+            if ch == ':':
+                self._state = 'value'
+        elif state == 'value':
+            if ch == '"':
+                self._state = 'string'
+                if self._wanted():
+                    self.values[self._key] = ''
+            elif ch in '{[':
+                self._depth = 1
+                self._skip_in_string = False
+                self._state = 'skip_nested'
+            elif not ch.isspace():
+                self._state = 'skip_scalar'
+        elif state == 'string':
+            return self._string_char(ch)
+        elif state == 'skip_nested':
+            self._skip_nested(ch)
+        elif state == 'skip_scalar':
+            if ch == ',':
+                self._state = 'key_or_end'
+            elif ch == '}':
+                self._state = 'end'
+        elif state == 'after_value':
+            if ch == ',':
+                self._state = 'key_or_end'
+            elif ch == '}':
+                self._state = 'end'
+        return None
+
+    def _string_char(self, ch):
+        out = None
+        if self._escape is not None:
+            if self._escape == '' and ch != 'u':
+                out = _ESCAPES.get(ch, ch)
+                self._escape = None
+            else:
+                self._escape += ch
+                if len(self._escape) == 5:  # u + 4 位十六进制
+                    out = self._decode_unicode(self._escape[1:])
+                    self._escape = None
+        elif ch == '\\':
+            self._escape = ''
+        elif ch == '"':
+            self._state = 'after_value'
+        else:
+            out = ch
+        if out and self._wanted():
+            self.values[self._key] += out
+            return out
+        return None
+
+    def _decode_unicode(self, hex_digits):
+        try:
+            code = int(hex_digits, 16)
+        except ValueError:
+            return None
+        if 0xD800 <= code < 0xDC00:
+            # 代理对的前半部分，等后半部分到达后一起解码
+            self._high_surrogate = code
+            return None
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            high, self._high_surrogate = self._high_surrogate, None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00))
+        return chr(code)
+
+    def _skip_nested(self, ch):
+        if self._skip_in_string:
+            if self._skip_escape:
+                self._skip_escape = False
+            elif ch == '\\':
+                self._skip_escape = True
+            elif ch == '"':
+                self._skip_in_string = False
+        elif ch == '"':
+            self._skip_in_string = True
+        elif ch in '{[':
+            self._depth += 1
+        elif ch in '}]':
+            self._depth -= 1
+            if self._depth == 0:
+                self._state = 'after_value'
+
+
+def sse_event(event, data):
+    """格式化一条 server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
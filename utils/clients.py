@@ -0,0 +1,63 @@
+# utils/clients.py 进程内共享的外部服务客户端
+# google.generativeai（grpc / protobuf）和 oss2 导入都很重，原来在模块导入时就初始化，
+# 每个 gunicorn worker、每条 flask db 命令都要为此付出启动时间。
+# 这里改为第一次真正用到时才导入并创建，之后整个进程复用同一个实例。
+import os
+import threading
+
+_lock = threading.Lock()
+_oss_helper = None
+_ai_model = None
+_oss_options = {}
+_ai_options = {}
+
+
+def init_app(app):
+    """读取连接池/超时/重试配置，并把共享客户端的获取函数挂到 app.extensions 上"""
+    _oss_options.update(
+        pool_size=app.config.get('OSS_POOL_SIZE', 10),
+        connect_timeout=app.config.get('OSS_CONNECT_TIMEOUT', 10),
+        max_retries=app.config.get('OSS_MAX_RETRIES', 3),
+        multipart_threshold=app.config.get('OSS_MULTIPART_THRESHOLD', 20 * 1024 * 1024),
+        part_size=app.config.get('OSS_PART_SIZE', 8 * 1024 * 1024),
+        upload_threads=app.config.get('OSS_UPLOAD_THREADS', 4),
+    )
+    _ai_options.update(
+        cache_dir=app.config.get('AI_CACHE_DIR'),
+        cache_ttl=app.config.get('AI_CACHE_TTL', 0),
+        daily_budget=app.config.get('AI_DAILY_TOKEN_BUDGET', 0),
+    )
+    app.extensions['oss'] = get_oss_helper
+    app.extensions['ai_model'] = get_ai_model
+
+
+def get_oss_helper():
+    """返回进程内共享的 OssHelper"""
+    global _oss_helper
+    if _oss_helper is None:
+        with _lock:
+            if _oss_helper is None:
+                from utils.oss_helper import OssHelper
+                _oss_helper = OssHelper(**_oss_options)
+    return _oss_helper
+
+
+def get_ai_model():
+    """
+    返回进程内共享的 Gemini 模型对象
+    外面包了一层 AiGateway（磁盘缓存、用量记录、每日预算），调用方式与 GenerativeModel 相同
+    """
+    global _ai_model
+    if _ai_model is None:
+        with _lock:
+            if _ai_model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _ai_model = wrap_ai_model(genai.GenerativeModel(os.getenv("GEMINI_MODEL", 'gemini-flash-latest')))
+    return _ai_model
+
+
+def wrap_ai_model(model):
+    """用 AiGateway 包装任意模型对象（如离线假模型），使用与线上相同的缓存/用量/预算配置"""
+    from utils.ai_gateway import AiGateway
+    return AiGateway(model, **_ai_options)
@@ -0,0 +1,94 @@
+# utils/export.py 后台数据流式导出
+# 激活码、用户、反馈等表都可能有几十万行，先 .all() 再拼成一个字符串会让内存随表大小增长。
+# 这里按列查询（不构造 ORM 对象），用 yield_per 分批取行（Postgres 上为服务端游标），
+# 边取边写成 CSV 或 NDJSON，攒够一块就发给浏览器，导出的内存占用与表大小无关。
+import io
+import csv
+import json
+from datetime import date, datetime
+from flask import Response, request, stream_with_context
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+# 每攒够这么多字节发送一次，避免每行一个 chunk
+FLUSH_BYTES = 64 * 1024
+# 以这些字符开头的单元格会被 Excel 当成公式执行（如用户反馈内容），导出时加前缀转义
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_format():
+    """从 ?format= 读取导出格式，未知格式按 CSV 处理"""
+    fmt = request.args.get('format', 'csv')
+    return fmt if fmt in FORMATS else 'csv'
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_csv(rows, columns, header=True):
+    """
+    :param columns: [(字段名, 表头, 格式化函数或 None)]，与行中的值一一对应
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        # 带 BOM，Excel 打开时中文表头不会乱码
+        buffer.write('\ufeff')
+        writer.writerow([label for _, label, _ in columns])
+    for row in rows:
+        writer.writerow([
+            _csv_cell(fmt(value) if fmt else value)
+            for value, (_, _, fmt) in zip(row, columns)
+        ])
+        if buffer.tell() > FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows, columns):
+    """每行一个 JSON 对象，值保持原始类型（格式化函数只用于 CSV）"""
+    names = [name for name, _, _ in columns]
+    chunk = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(names, row)), ensure_ascii=False, default=_json_default) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size > FLUSH_BYTES:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    yield ''.join(chunk)
+
+
+def stream_export(query, columns, filename, fmt='csv', header=True, batch_size=2000):
+    """
+    把查询结果以流式响应导出
+    :param query: 按列查询的 Query/Select（如 db.session.query(Model.a, Model.b)），列顺序与 columns 一致
+    :param columns: [(字段名, 表头, 格式化函数或 None)]
+    :param filename: 下载文件名（不含扩展名）
+    :param header: CSV 是否输出表头（纯列表用于复制时可关闭）
+    """
+    mimetype, extension = FORMATS[fmt]
+    rows = query.execution_options(yield_per=batch_size)
+    body = iter_csv(rows, columns, header) if fmt == 'csv' else iter_ndjson(rows, columns)
+    return Response(
+        stream_with_context(body), mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{extension}"'}
+    )
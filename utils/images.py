@@ -0,0 +1,119 @@
+# utils/images.py 封面图衍生图
+# 封面上传（或填写本 Bucket 的链接）后，由 OSS 图片处理生成几种固定宽度的 WebP 衍生图，
+# 路径由原图路径推导（derived/<原路径>_<规格>.webp），重复生成会覆盖同一对象。
+# 衍生图链接记录在 GuideContent.cover_variants 中，模板按展示尺寸选用并输出 srcset。
+# 每种规格要两次 OSS 往返（处理另存 + 补 ACL/缓存头），由后台线程生成，保存指南的请求只登记 guide_id；
+# 生成完成前模板退回原图，进程退出时没来得及生成的由 `flask covers rebuild` 补齐。
+import os
+import queue
+import threading
+from sqlalchemy import select
+from extensions import db
+from models import GuideContent
+
+# 规格名 -> 宽度（像素）；m_lfit 按宽度等比缩小，原图更小时不放大
+COVER_VARIANTS = {
+    'thumb': 160,   # 后台列表缩略图
+    'card': 480,    # 列表/收藏卡片
+    'hero': 1200,   # 详情页顶部大图
+}
+WEBP_QUALITY = int(os.getenv('COVER_WEBP_QUALITY', 80))
+
+
+def variant_key(src_key, variant):
+    """衍生图的固定路径：images/abc.png -> derived/images/abc_card.webp"""
+    stem = src_key.rsplit('.', 1)[0]
+    return f"derived/{stem}_{variant}.webp"
+
+
+def build_cover_variants(oss_helper, cover_url):
+    """
+    为封面生成全部规格的衍生图
+    :return: {规格名: 链接}；外部链接或生成失败时返回 None，模板会退回原图
+    """
+    src_key = oss_helper.key_from_url(cover_url)
+    if not src_key:
+        return None
+    try:
+        return {
+            name: oss_helper.save_processed(
+                src_key, variant_key(src_key, name),
+                f"image/resize,m_lfit,w_{width}/format,webp/quality,q_{WEBP_QUALITY}"
+            )
+            for name, width in COVER_VARIANTS.items()
+        }
+    except Exception as e:
+        print(f"封面衍生图生成失败: {e}")
+        return None
+
+
+def update_cover_variants(oss_helper, guide_id):
+    """为一篇指南生成衍生图并写回，返回是否写入"""
+    table = GuideContent.__table__
+    cover_url = db.session.execute(select(table.c.cover_image_url).where(table.c.id == guide_id)).scalar()
+    variants = build_cover_variants(oss_helper, cover_url)
+    if not variants:
+        return False
+    # 生成期间封面又被修改时不写回（新封面已重新登记）；不修改 updated_at，避免正文渲染缓存失效
+    result = db.session.execute(
+        table.update()
+        .where(table.c.id == guide_id, table.c.cover_image_url == cover_url)
+        .values(cover_variants=variants, updated_at=table.c.updated_at)
+    )
+    db.session.commit()
+    return result.rowcount > 0
+
+
+class CoverVariantBuilder:
+    """在后台线程中为登记的指南生成封面衍生图"""
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['cover_variants'] = self
+
+    def schedule(self, guide_id):
+        """登记需要（重新）生成衍生图的指南，在提交事务之后调用"""
+        self._ensure_worker()
+        self._queue.put(guide_id)
+
+    def _ensure_worker(self):
+        # gunicorn 预加载后 fork 的子进程不会继承线程，按进程号判断是否需要重新启动
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            threading.Thread(target=self._worker_loop, name='cover-variants', daemon=True).start()
+
+    def _worker_loop(self):
+        from utils.clients import get_oss_helper
+        while True:
+            guide_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    update_cover_variants(get_oss_helper(), guide_id)
+            except Exception as e:
+                print(f"封面衍生图生成失败: {e}")
+
+
+def cover_src(guide, variant='card'):
+    """模板中使用：指定规格的封面链接，没有衍生图时返回原图"""
+    variants = guide.cover_variants or {}
+    return variants.get(variant) or guide.cover_image_url
+
+
+def cover_srcset(guide):
+    """模板中使用：'链接 160w, 链接 480w, ...'，没有衍生图时返回空字符串"""
+    variants = guide.cover_variants or {}
+    return ', '.join(
+        f"{variants[name]} {width}w" for name, width in COVER_VARIANTS.items() if variants.get(name)
+    )
+
+
+cover_builder = CoverVariantBuilder()
@@ -0,0 +1,133 @@
+# utils/material_index.py 素材索引
+# OSS 上的对象在 material_object 表中保留一份镜像（路径、大小、类型、修改时间）。
+# 通过素材中心上传/删除时同步增删记录；在控制台之外（如 ossutil）改动的文件
+# 由 `flask materials reconcile` 定期对账补齐。
+import re
+import mimetypes
+from datetime import datetime
+from sqlalchemy import or_
+from extensions import db
+from models import MaterialObject, MaterialFolder
+
+# 素材列表允许的排序字段
+SORT_COLUMNS = {
+    'last_modified': MaterialObject.last_modified,
+    'size': MaterialObject.size,
+    'name': MaterialObject.name,
+}
+
+
+def _split_key(key):
+    """'video/abc.mp4' -> ('video/', 'abc.mp4')"""
+    folder, _, name = key.rpartition('/')
+    return (folder + '/' if folder else ''), name
+
+
+def record(key, size, content_type=None, last_modified=None):
+    """
+    登记（或更新）一个对象，上传成功后调用
+    :param last_modified: OSS 上的修改时间（head_object 的结果），对账时与列举结果比较；
+                          传本机时间的话下次对账会把它当成“已变化”
+    """
+    folder, name = _split_key(key)
+    now = datetime.utcnow()
+    db.session.merge(MaterialObject(
+        key=key, folder=folder, name=name, size=size or 0,
+        content_type=content_type or mimetypes.guess_type(key)[0],
+        last_modified=last_modified or now, synced_at=now
+    ))
+    db.session.commit()
+
+
+def remove(keys):
+    """删除对象对应的索引记录，OSS 删除成功后调用"""
+    if not keys:
+        return 0
+    count = MaterialObject.query.filter(MaterialObject.key.in_(keys)).delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def search(folder, keyword=None, content_type=None, sort='last_modified', order='desc'):
+    """
+    构造素材列表查询，由调用方分页
+    :param keyword: 按文件名模糊匹配
+    :param content_type: MIME 前缀过滤，如 'image/'、'application/pdf'
+    :param sort: last_modified / size / name
+    """
+    query = MaterialObject.query.filter_by(folder=folder)
+    if keyword:
+        # 文件名里的 % 和 _ 按普通字符匹配
+        pattern = '%' + re.sub(r'([\\%_])', r'\\\1', keyword) + '%'
+        query = query.filter(or_(MaterialObject.name.ilike(pattern, escape='\\'),
+                                 MaterialObject.key.ilike(pattern, escape='\\')))
+    if content_type:
+        query = query.filter(MaterialObject.content_type.like(f'{content_type}%'))
+
+    column = SORT_COLUMNS.get(sort, MaterialObject.last_modified)
+    if order == 'asc':
+        return query.order_by(column.asc(), MaterialObject.key.asc())
+    return query.order_by(column.desc(), MaterialObject.key.desc())
+
+
+def needs_initial_sync(folder):
+    """该目录是否从未与 OSS 对账过（首次使用时需要对账一次；目录本来就是空的也只对账一次）"""
+    if db.session.get(MaterialFolder, folder):
+        return False
+    # 对账记录表上线前已有索引数据的目录，视为已同步过
+    return not db.session.query(MaterialObject.query.filter_by(folder=folder).exists()).scalar()
+
+
+def reconcile(oss_helper, prefixes, batch_size=500):
+    """
+    以 OSS 实际列举结果为准校正索引：补录新增、更新变化、清理已不存在的对象
+    扫描期间通过 record() 新登记的对象 synced_at 晚于扫描开始时间，不会被误删
+    :return: (新增数, 更新数, 删除数)
+    """
+    added = updated = removed = 0
+    for prefix in prefixes:
+        started = datetime.utcnow()
+        known = {
+            key: (size, modified) for key, size, modified in db.session.query(
+                MaterialObject.key, MaterialObject.size, MaterialObject.last_modified
+            ).filter(MaterialObject.folder == prefix)
+        }
+        pending = 0
+        for info in oss_helper.iter_objects(prefix=prefix):
+            current = known.pop(info['key'], None)
+            if current == (info['size'], info['last_modified']):
+                continue
+            folder, name = _split_key(info['key'])
+            db.session.merge(MaterialObject(folder=folder, name=name, synced_at=started, **info))
+            if current is None:
+                added += 1
+            else:
+                updated += 1
+            pending += 1
+            if pending >= batch_size:
+                db.session.commit()
+                pending = 0
+        db.session.merge(MaterialFolder(folder=prefix, synced_at=started))
+        db.session.commit()
+
+        if known:
+            stale = list(known)
+            for i in range(0, len(stale), batch_size):
+                removed += MaterialObject.query.filter(
+                    MaterialObject.key.in_(stale[i:i + batch_size]),
+                    or_(MaterialObject.synced_at.is_(None), MaterialObject.synced_at < started)
+                ).delete(synchronize_session=False)
+            db.session.commit()
+    return added, updated, removed
+
+
+def to_dict(material, oss_helper):
+    """素材中心前端需要的字段"""
+    return {
+        'name': material.name,
+        'url': oss_helper.public_url(material.key),
+        'path': material.key,  # 删除时的唯一凭证
+        'size': material.size,
+        'content_type': material.content_type,
+        'last_modified': material.last_modified.strftime('%Y-%m-%d %H:%M:%S'),
+    }
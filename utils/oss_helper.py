@@ -1,6 +1,15 @@
 # utils/oss_helper.py
 import os
+import re
+import json
+import time
 import uuid
+import base64
+import hmac
+import hashlib
+import shutil
+import tempfile
+import threading
 import oss2, mimetypes
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
@@ -8,8 +17,22 @@ import datetime # 确保导入了 datetime
 
 load_dotenv() # 必须在所有 os.getenv 之前调用
 
+# 正文中 OSS 链接的占位前缀：本身是合法 URL，Markdown 渲染时与真实链接的处理方式完全一致
+SIGN_PLACEHOLDER = 'https://oss-sign.invalid/'
+_PLACEHOLDER_PATTERN = re.compile(re.escape(SIGN_PLACEHOLDER) + r"([^\s\)\?\"'<>]+)")
+
 class OssHelper:
-    def __init__(self):
+    def __init__(self, pool_size=10, connect_timeout=10, max_retries=3, retry_backoff=0.5,
+                 multipart_threshold=20 * 1024 * 1024, part_size=8 * 1024 * 1024, upload_threads=4):
+        """
+        :param pool_size: HTTP 连接池大小，并发上传时复用已建立的 TLS 连接
+        :param connect_timeout: 连接/读取超时（秒）
+        :param max_retries: 网络错误或 5xx 时的最大重试次数
+        :param retry_backoff: 首次重试前的等待秒数，之后按指数翻倍
+        :param multipart_threshold: 超过该大小（字节）的文件改用分片断点续传
+        :param part_size: 分片大小（字节）
+        :param upload_threads: 并行上传的分片数
+        """
         # 从环境变量读取凭证，确保安全
         self.access_key_id = os.getenv('OSS_ACCESS_KEY_ID')
         self.access_key_secret = os.getenv('OSS_ACCESS_KEY_SECRET')
@@ -17,30 +40,81 @@ class OssHelper:
         self.endpoint = 'https://oss-cn-beijing.aliyuncs.com'
         self.bucket_name = 'my-media-system'
         
-        # 初始化 Auth 和 Bucket
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self.upload_threads = upload_threads
+
+        # 初始化 Auth 和 Bucket：整个进程共用一个带连接池的 Session
         auth = oss2.Auth(self.access_key_id, self.access_key_secret)
-        self.bucket = oss2.Bucket(auth, self.endpoint, self.bucket_name)
+        self.session = oss2.Session(pool_size=pool_size)
+        self.bucket = oss2.Bucket(auth, self.endpoint, self.bucket_name,
+                                  session=self.session, connect_timeout=connect_timeout)
 
-    def upload_file(self, file_obj, folder='images', is_private=False):
+        # 签名链接缓存：{(key, expires): (signed_url, 过期时间戳)}
+        self._sign_cache = {}
+        self._sign_lock = threading.Lock()
+        # 签名剩余有效期低于这个比例时重新签名，保证发给浏览器的链接仍有足够的可用时间
+        self.sign_refresh_ratio = 0.2
+
+        domain = f"{self.bucket_name}.{self.endpoint.replace('https://', '').replace('http://', '')}"
+        # 排除引号、括号和尖括号，确保匹配到 Markdown 链接或 HTML 属性结尾就停止
+        self._url_pattern = re.compile(rf"https?://{re.escape(domain)}/([^\s\)\?\"'<>]+)")
+
+    def upload_file(self, file_obj, folder='images', is_private=False, progress_callback=None):
         """
         上传文件到 OSS
         :param file_obj: Flask request.files 中的文件对象
         :param folder: OSS 上的目录名 (images/videos/audios)
         :param is_private: 是否设为私有文件
+        :param progress_callback: 可选，大文件上传进度回调 callback(已上传字节数, 总字节数)
         :return: 文件在 OSS 的完整访问路径
         """
-        filename = secure_filename(file_obj.filename)
+        oss_path, content_type = self._object_key(file_obj.filename, folder)
+        headers = self._upload_headers(content_type, is_private)
+
+        if self.stream_size(file_obj) >= self.multipart_threshold:
+            # 大文件（视频/音频）走分片断点续传，失败重试时从已完成的分片继续
+            self._resumable_upload(file_obj, oss_path, headers, progress_callback)
+        else:
+            # 上传文件流（重试前把文件指针拨回开头）
+            def put():
+                if hasattr(file_obj, 'seek'):
+                    file_obj.seek(0)
+                return self.bucket.put_object(oss_path, file_obj, headers=headers)
+            self._with_retry(put)
+
+        # 返回访问链接
+        if is_private:
+            # 私有文件返回路径，之后需调用 sign_url 生成带 Token 的链接
+            return oss_path 
+        else:
+            # 公开文件直接返回 CDN/OSS 直链
+            return self.public_url(oss_path)
+
+    def public_url(self, oss_path):
+        """公开文件的直链"""
+        return f"https://{self.bucket_name}.oss-cn-beijing.aliyuncs.com/{oss_path}"
+
+    def _object_key(self, filename, folder):
+        """生成唯一对象路径并识别 MIME 类型，返回 (oss_path, content_type)"""
+        filename = secure_filename(filename)
         # 生成唯一文件名，防止覆盖
         ext = filename.rsplit('.', 1)[1].lower()
         unique_name = f"{uuid.uuid4().hex}.{ext}"
-        oss_path = f"{folder}/{unique_name}"
+        # 素材中心传入的目录带有结尾的 /，这里统一去掉，避免出现 video//xxx.mp4
+        oss_path = f"{folder.rstrip('/')}/{unique_name}"
 
         # 动态识别 MIME 类型
         content_type, _ = mimetypes.guess_type(filename)
         if not content_type:
             # 根据文件夹兜底
-            content_type = 'video/mp4' if folder == 'videos' else 'audio/mpeg'
+            content_type = 'video/mp4' if folder.startswith('video') else 'audio/mpeg'
+        return oss_path, content_type
 
+    @staticmethod
+    def _upload_headers(content_type, is_private):
         headers = {
             'Content-Type': content_type, # 明确告诉浏览器这是图片
             'Cache-Control': 'max-age=31536000', # 重点：设置长久缓存，节省流量
@@ -50,47 +124,136 @@ class OssHelper:
             headers['x-oss-object-acl'] = oss2.OBJECT_ACL_PRIVATE
         else:
             headers['x-oss-object-acl'] = oss2.OBJECT_ACL_PUBLIC_READ
+        return headers
 
-        # 上传文件流
-        self.bucket.put_object(oss_path, file_obj, headers=headers)
+    @staticmethod
+    def stream_size(file_obj):
+        """获取上传文件大小（字节），无法获取时返回 0"""
+        stream = getattr(file_obj, 'stream', file_obj)
+        try:
+            position = stream.tell()
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
+            stream.seek(position)
+            return size
+        except Exception:
+            return getattr(file_obj, 'content_length', 0) or 0
 
-        # 返回访问链接
-        if is_private:
-            # 私有文件返回路径，之后需调用 sign_url 生成带 Token 的链接
-            return oss_path 
-        else:
-            # 公开文件直接返回 CDN/OSS 直链
-            return f"https://{self.bucket_name}.oss-cn-beijing.aliyuncs.com/{oss_path}"
+    def _resumable_upload(self, file_obj, oss_path, headers, progress_callback=None):
+        """
+        先把上传流落到本地临时文件，再用 oss2.resumable_upload 并行上传分片；
+        断点信息记录在临时目录中，_with_retry 重试时会跳过已完成的分片
+        """
+        work_dir = tempfile.mkdtemp(prefix='oss-upload-')
+        try:
+            local_path = os.path.join(work_dir, 'payload')
+            stream = getattr(file_obj, 'stream', file_obj)
+            stream.seek(0)
+            with open(local_path, 'wb') as f:
+                shutil.copyfileobj(stream, f, length=1024 * 1024)
 
-    def get_signed_url(self, oss_path, expires=3600):
-        """生成私有文件的临时访问链接"""
-        return self.bucket.sign_url('GET', oss_path, expires)
+            self._with_retry(
+                oss2.resumable_upload, self.bucket, oss_path, local_path,
+                store=oss2.ResumableStore(root=work_dir),
+                headers=headers,
+                multipart_threshold=self.multipart_threshold,
+                part_size=self.part_size,
+                num_threads=self.upload_threads,
+                progress_callback=progress_callback
+            )
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
-    def list_files(self, prefix='material/'):
-        """获取 OSS 指定目录下的文件列表"""
-        files = []
-        try:
-            # 遍历指定前缀的文件
-            for obj in oss2.ObjectIterator(self.bucket, prefix=prefix):
-                if obj.key.endswith('/'): 
-                    continue 
-                
-                # 将时间戳或 datetime 转换为人类可读的字符串
-                # 如果是整数时间戳：
-                last_mod = datetime.datetime.fromtimestamp(obj.last_modified).strftime('%Y-%m-%d %H:%M:%S')
-                
-                files.append({
-                    'name': obj.key.replace(prefix, ""), # 只显示文件名，去掉前缀
-                    'url': f"https://{self.bucket_name}.oss-cn-beijing.aliyuncs.com/{obj.key}",
-                    'path': obj.key,  # !!! 必须包含这一行，它是删除的唯一凭证
-                    'size': obj.size,
-                    'last_modified': last_mod # 转换后的字符串
-                })
-            # 按时间倒序排列
-            return sorted(files, key=lambda x: x['last_modified'], reverse=True)
-        except Exception as e:
-            print(f"OSS 列表获取失败: {e}")
-            return []
+    def build_post_policy(self, filename, folder, max_size=2 * 1024 ** 3, expires=900, is_private=False):
+        """
+        生成浏览器直传 OSS 所需的 PostObject 表单字段（签名策略），
+        文件字节不再经过 Flask worker
+        :param max_size: 允许上传的最大字节数
+        :param expires: 策略有效期（秒）
+        :return: {'host': 上传地址, 'fields': 表单字段, 'key': 对象路径, 'url': 上传后的访问链接}
+        """
+        oss_path, content_type = self._object_key(filename, folder)
+        acl = oss2.OBJECT_ACL_PRIVATE if is_private else oss2.OBJECT_ACL_PUBLIC_READ
+        expiration = datetime.datetime.utcnow() + datetime.timedelta(seconds=expires)
+        cache_control = 'max-age=31536000'
+        policy = {
+            'expiration': expiration.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'conditions': [
+                ['content-length-range', 1, max_size],
+                ['eq', '$key', oss_path],
+                ['eq', '$Content-Type', content_type],
+                ['eq', '$x-oss-object-acl', acl],
+                # 表单里的每个字段都要写进策略，否则浏览器端可以随意改掉
+                {'Cache-Control': cache_control},
+            ]
+        }
+        encoded_policy = base64.b64encode(json.dumps(policy).encode()).decode()
+        signature = base64.b64encode(
+            hmac.new(self.access_key_secret.encode(), encoded_policy.encode(), hashlib.sha1).digest()
+        ).decode()
+        return {
+            'host': f"https://{self.bucket_name}.oss-cn-beijing.aliyuncs.com",
+            'key': oss_path,
+            'url': oss_path if is_private else self.public_url(oss_path),
+            'fields': {
+                'key': oss_path,
+                'policy': encoded_policy,
+                'OSSAccessKeyId': self.access_key_id,
+                'signature': signature,
+                'success_action_status': '200',
+                'Content-Type': content_type,
+                'x-oss-object-acl': acl,
+                'Cache-Control': cache_control,
+            }
+        }
+
+    def iter_objects(self, prefix='material/'):
+        """
+        遍历 OSS 指定目录下的全部对象（素材索引对账时使用）
+        :return: 生成器，每项为 {'key', 'size', 'content_type', 'last_modified'}
+        """
+        for obj in oss2.ObjectIterator(self.bucket, prefix=prefix):
+            if obj.key.endswith('/'):
+                continue
+            yield {
+                'key': obj.key,
+                'size': obj.size,
+                # 列举接口不返回 Content-Type，按扩展名推断（与上传时的识别方式一致）
+                'content_type': mimetypes.guess_type(obj.key)[0] or 'application/octet-stream',
+                'last_modified': datetime.datetime.utcfromtimestamp(obj.last_modified),
+            }
+
+    def get_object_info(self, oss_path):
+        """
+        读取单个对象的元信息（浏览器直传完成后登记素材索引时使用）
+        :return: {'key', 'size', 'content_type', 'last_modified'}
+        """
+        meta = self._with_retry(self.bucket.head_object, oss_path)
+        return {
+            'key': oss_path,
+            'size': meta.content_length,
+            'content_type': meta.content_type,
+            'last_modified': datetime.datetime.utcfromtimestamp(meta.last_modified),
+        }
+
+    def key_from_url(self, url):
+        """从本 Bucket 的访问链接中取出对象路径，不是本 Bucket 的链接返回 None"""
+        match = self._url_pattern.match(url or '')
+        return match.group(1) if match else None
+
+    def save_processed(self, src_key, dest_key, process):
+        """
+        调用 OSS 图片处理并把结果另存为新对象（sys/saveas），图片不经过本机
+        :param process: 处理参数，如 'image/resize,m_lfit,w_480/format,webp'
+        :return: 新对象的公开访问链接
+        """
+        target = oss2.compat.to_string(base64.urlsafe_b64encode(oss2.compat.to_bytes(dest_key)))
+        bucket = oss2.compat.to_string(base64.urlsafe_b64encode(oss2.compat.to_bytes(self.bucket_name)))
+        self._with_retry(self.bucket.process_object, src_key, f"{process}|sys/saveas,o_{target},b_{bucket}")
+        # saveas 生成的对象没有 ACL 和缓存头（会继承 Bucket 的私有权限），按公开上传的规则补上
+        content_type = mimetypes.guess_type(dest_key)[0] or 'application/octet-stream'
+        self._with_retry(self.bucket.update_object_meta, dest_key, self._upload_headers(content_type, is_private=False))
+        return self.public_url(dest_key)
 
     def delete_file(self, oss_path):
         """
@@ -99,7 +262,7 @@ class OssHelper:
         """
         try:
             # 执行删除操作
-            self.bucket.delete_object(oss_path)
+            self._with_retry(self.bucket.delete_object, oss_path)
             return True
         except Exception as e:
             print(f"OSS 删除失败: {e}")
@@ -114,12 +277,28 @@ class OssHelper:
             return True
         try:
             # 执行批量删除
-            result = self.bucket.batch_delete_objects(oss_paths)
+            result = self._with_retry(self.bucket.batch_delete_objects, oss_paths)
             return True
         except Exception as e:
             print(f"OSS 批量删除失败: {e}")
             raise e
         
+    def _with_retry(self, func, *args, **kwargs):
+        """
+        执行一次 OSS 请求，遇到网络错误或服务端 5xx 时按指数退避重试
+        4xx 等客户端错误直接抛出，不做重试
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except (oss2.exceptions.RequestError, oss2.exceptions.ServerError) as e:
+                retryable = isinstance(e, oss2.exceptions.RequestError) or getattr(e, 'status', 0) >= 500
+                if not retryable or attempt == self.max_retries:
+                    raise
+                wait = self.retry_backoff * (2 ** attempt)
+                print(f"OSS 请求失败，{wait:.1f} 秒后重试（第 {attempt + 1} 次）: {e}")
+                time.sleep(wait)
+
     def get_signed_url(self, obj_key, expires=1800):
         """
         根据对象路径生成带签名的访问链接
@@ -137,10 +316,36 @@ class OssHelper:
         # 提取关键路径（如果存入的是全路径，需要剥离出 key）
         # 假设存的是 'images/3b98ef...png'
         key = obj_key.split('.com/')[-1] if 'http' in obj_key else obj_key
+        return self._sign_key(key, expires)
 
-        auth = oss2.Auth(self.access_key_id, self.access_key_secret)
-        bucket = oss2.Bucket(auth, self.endpoint, self.bucket_name)
-        
-        # 生成带签名的 GET 请求 URL
-        signed_url = bucket.sign_url('GET', key, expires)
-        return signed_url
\ No newline at end of file
+    def _sign_key(self, key, expires=1800):
+        """
+        对单个对象签名，同一个 key 在有效期的大部分时间内复用同一个签名链接
+        """
+        now = time.time()
+        cache_key = (key, expires)
+        cached = self._sign_cache.get(cache_key)
+        if cached and cached[1] - now > expires * self.sign_refresh_ratio:
+            return cached[0]
+
+        # 生成带签名的 GET 请求 URL（复用实例上的 bucket，不再每次新建 Auth/Bucket）
+        signed_url = self.bucket.sign_url('GET', key, expires)
+        with self._sign_lock:
+            if len(self._sign_cache) > 5000:
+                # 顺手清理已过期的条目，避免缓存无限增长
+                self._sign_cache = {k: v for k, v in self._sign_cache.items() if v[1] > now}
+            self._sign_cache[cache_key] = (signed_url, now + expires)
+        return signed_url
+
+    def to_placeholders(self, text):
+        """
+        把正文中指向本 Bucket 的链接替换为稳定的占位链接
+        渲染后的 HTML 只包含占位链接，可以放心长期缓存
+        """
+        if not text:
+            return text or ''
+        return self._url_pattern.sub(lambda m: SIGN_PLACEHOLDER + m.group(1), text)
+
+    def sign_placeholders(self, html, expires=1800):
+        """在响应时一次性把所有占位链接替换为新鲜的签名链接"""
+        return _PLACEHOLDER_PATTERN.sub(lambda m: self._sign_key(m.group(1), expires), html)
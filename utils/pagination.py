@@ -0,0 +1,90 @@
+# utils/pagination.py 分页辅助
+import os
+import json
+import time
+import base64
+import threading
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+# --- 1. 游标分页（瀑布流无限滚动） ---
+def encode_cursor(values):
+    """把最后一条记录的排序键编码为 URL 安全的游标字符串"""
+    payload = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标，格式不正确时返回 None（相当于从第一页开始）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        return [datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in json.loads(raw)]
+    except Exception:
+        return None
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.total = total
+
+
+def keyset_paginate(query, columns, cursor=None, per_page=10, with_total=False):
+    """
+    按 (created_at, id) 这类唯一且单调的组合键倒序翻页：
+    WHERE (created_at, id) < (游标值) ORDER BY created_at DESC, id DESC LIMIT n
+    翻到多深都只扫描 per_page 条，不需要 OFFSET，也不需要 COUNT(*)
+    :param columns: 排序列，最后一列必须唯一（通常是主键）
+    :param with_total: 需要总数时返回缓存的近似值
+    """
+    total = cached_count(query) if with_total else None
+    values = decode_cursor(cursor) if cursor else None
+    if values and len(values) == len(columns):
+        query = query.filter(tuple_(*columns) < tuple_(*values))
+    rows = query.order_by(*[c.desc() for c in columns]).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return KeysetPage(rows, next_cursor, total)
+
+
+# --- 2. 带缓存总数的页码分页（后台表格） ---
+_count_cache = {}
+_count_lock = threading.Lock()
+COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_TTL', 30))
+
+
+def cached_count(query, ttl=COUNT_CACHE_TTL):
+    """
+    同一个查询条件的 COUNT(*) 结果缓存 ttl 秒
+    列表页的总数只用于显示页码，几十秒内的误差可以接受
+    """
+    stmt = query.order_by(None).statement
+    key = (str(stmt), repr(sorted(stmt.compile().params.items(), key=lambda kv: kv[0])))
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    total = query.order_by(None).count()
+    with _count_lock:
+        if len(_count_cache) > 1000:
+            _count_cache.clear()
+        _count_cache[key] = (total, now + ttl)
+    return total
+
+
+def paginate_cached(query, page, per_page, error_out=True):
+    """
+    与 query.paginate() 相同，但总数来自 cached_count，
+    避免每次翻页都额外执行一次 COUNT(*)
+    """
+    pagination = query.paginate(page=page, per_page=per_page, error_out=error_out, count=False)
+    pagination.total = cached_count(query)
+    return pagination
@@ -0,0 +1,112 @@
+# utils/passwords.py 密码哈希
+# 原来直接用 werkzeug 的默认参数，哈希成本随库版本变化，也没法按服务器的 CPU 预算调整。
+# 这里统一管理：
+# 1. 算法和成本由 PASSWORD_HASH_METHOD 配置（werkzeug 的 method 写法，如 scrypt:16384:8:1、pbkdf2:sha256:600000）；
+# 2. 登录校验成功后，如果库里的哈希参数与当前配置不同，用明文重新哈希（参数调整后用户无感升级）；
+# 3. 哈希计算放进有上限的线程池，同时在算的数量不超过 PASSWORD_HASH_WORKERS（通常取 CPU 核数），
+#    活动后登录高峰时多出来的请求排队，而不是一起抢 CPU 拖慢全站；排队过长时直接拒绝。
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# 手机号不存在时拿它做一次同等成本的校验，避免通过响应时间判断手机号是否已注册
+_DUMMY_PASSWORD = 'password-hasher-timing-dummy'
+
+
+class PasswordHasherBusy(RuntimeError):
+    """排队中的哈希计算过多"""
+
+
+class PasswordHasher:
+    """
+    :param method: werkzeug generate_password_hash 的 method 参数
+    :param workers: 同时进行哈希计算的线程数
+    :param max_pending: 允许排队等待的计算数，超过时抛出 PasswordHasherBusy
+    """
+    def __init__(self, method='scrypt', workers=None, max_pending=64):
+        self.method = method
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._prefix = None
+        self._dummy_hash = None
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS') or self.workers
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending)
+        self._prefix = self._dummy_hash = None
+        app.extensions['password_hasher'] = self
+
+    # --- 对外接口 ---
+    def hash(self, password):
+        return self._submit(generate_password_hash, password, method=self.method)
+
+    def verify(self, password_hash, password):
+        """校验密码；password_hash 为空（用户不存在）时同样做一次哈希计算再返回 False"""
+        if not password_hash:
+            self._submit(check_password_hash, self._get_dummy_hash(), password or '')
+            return False
+        if not password:
+            return False
+        return self._submit(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """库里的哈希算法或成本参数与当前配置不同"""
+        return password_hash.split('$', 1)[0] != self.method_prefix()
+
+    def verify_and_update(self, user, password):
+        """
+        校验用户密码，成功且需要升级时更新 user.password_hash（由调用方提交事务）
+        :param user: User 对象或 None
+        """
+        if not self.verify(user.password_hash if user else None, password):
+            return False
+        if self.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = self.hash(password)
+            except PasswordHasherBusy:
+                # 密码已经校验通过，排队过长时本次跳过升级，下次登录再做
+                pass
+        return True
+
+    def method_prefix(self):
+        """当前配置写入哈希时的前缀：'scrypt' 实际写入的是 'scrypt:32768:8:1'，用一次真实哈希得到规范化后的写法"""
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return self._prefix
+
+    # --- 内部实现 ---
+    def _get_dummy_hash(self):
+        if self._dummy_hash is None:
+            self._dummy_hash = generate_password_hash(_DUMMY_PASSWORD, method=self.method)
+        return self._dummy_hash
+
+    def _get_executor(self):
+        # gunicorn fork 出的子进程不会继承父进程的线程，按进程创建线程池
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                    self._pending = 0
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _submit(self, fn, *args, **kwargs):
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.workers + self.max_pending:
+                raise PasswordHasherBusy("登录人数较多，请稍后再试")
+            self._pending += 1
+        try:
+            return executor.submit(fn, *args, **kwargs).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,185 @@
+# utils/rate_limit.py 登录/激活接口限流
+# 登录每次尝试都要查库并做一次完整的密码哈希，激活码页每次尝试都要查一次库；
+# 不加限制时，一个猜激活码的脚本就相当于对 CPU 和数据库做压测。
+# 这里用令牌桶按 IP、手机号等维度限流，在视图函数查库/哈希之前直接返回 429。
+# 令牌桶默认保存在进程内存中；多 worker / 多机部署时配置 RATE_LIMIT_STORAGE_URL=redis://... 改为共享存储。
+import math
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, flash, render_template, jsonify
+
+# 默认限额：名称 -> "桶容量/完全恢复所需秒数"，可通过 RATE_LIMITS 配置覆盖
+DEFAULT_LIMITS = {
+    'login_ip': '20/300',       # 同一 IP 连续 20 次，之后每 15 秒恢复 1 次
+    'login_phone': '5/300',     # 同一手机号连续 5 次，之后每分钟恢复 1 次
+    'activate_ip': '10/300',    # 同一 IP 连续 10 次，之后每 30 秒恢复 1 次
+    'activate_all': '120/60',   # 全站激活码尝试总量：只告警不拦截，换 IP 批量猜码时提醒排查
+}
+# 同一告警规则两次打印之间的最短间隔（秒）
+ALARM_INTERVAL = 60
+
+
+def parse_limit(spec):
+    """'20/300' -> (容量 20, 每秒恢复 20/300 个令牌)"""
+    capacity, period = spec.split('/')
+    capacity, period = int(capacity), float(period)
+    if capacity <= 0 or period <= 0:
+        raise ValueError(f"无效的限流配置: {spec}")
+    return capacity, capacity / period
+
+
+class MemoryBackend:
+    """
+    进程内令牌桶，按最近使用顺序保存
+    :param max_keys: 最多保存的桶数量，超出时淘汰最久未使用的桶
+    """
+    def __init__(self, max_keys=100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()  # key -> (剩余令牌, 上次更新时间)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if tokens >= 1 else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisBackend:
+    """
+    多进程共享的令牌桶，计算在 Lua 脚本中原子完成，时间取 Redis 服务器时间
+    redis 客户端在第一次使用时才导入（未使用共享存储的部署不需要安装）
+    """
+    _SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+    return tostring(wait)
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        self.url = url
+        self.prefix = prefix
+        self._script = None
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        if self._script is None:
+            with self._lock:
+                if self._script is None:
+                    import redis
+                    self._script = redis.Redis.from_url(self.url).register_script(self._SCRIPT)
+        return float(self._script(keys=[self.prefix + key], args=[capacity, rate]))
+
+
+class RequestLimiter:
+    """
+    按名称配置的一组令牌桶
+    :param backend: 具有 take(key, capacity, rate) -> 等待秒数 的存储
+    """
+    def __init__(self, backend=None):
+        self.enabled = True
+        self.backend = backend or MemoryBackend()
+        self.limits = {name: parse_limit(spec) for name, spec in DEFAULT_LIMITS.items()}
+        self._alarmed = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        for name, spec in (app.config.get('RATE_LIMITS') or {}).items():
+            self.limits[name] = parse_limit(spec)
+        storage_url = app.config.get('RATE_LIMIT_STORAGE_URL')
+        if storage_url:
+            self.backend = RedisBackend(storage_url)
+        app.extensions['rate_limiter'] = self
+
+    def hit(self, name, key):
+        """记一次尝试，允许时返回 0，否则返回需要等待的秒数"""
+        if not self.enabled:
+            return 0
+        capacity, rate = self.limits[name]
+        try:
+            return self.backend.take(f"{name}:{key}", capacity, rate)
+        except Exception as e:
+            # 共享存储不可用时放行，不能因为限流组件故障导致所有人无法登录
+            print(f"限流检查失败，已放行: {e}")
+            return 0
+
+    def limit(self, *rules, alarms=(), template=None, methods=('POST',)):
+        """
+        视图装饰器，按顺序检查每条规则，任一规则超限即返回 429
+        :param rules: (限额名称, 返回限流 key 的函数) ；函数返回空值时跳过该规则
+        :param alarms: 与 rules 格式相同，超限时只打印告警、照常放行；
+                       用于全站总量这类所有人共用一个桶的规则，拦截的话攻击者就能挡住全部正常用户
+        :param template: 超限时渲染的模板（带 flash 提示），为空时返回 JSON
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                if request.method in methods:
+                    for name, key_func in rules:
+                        key = key_func()
+                        if not key:
+                            continue
+                        wait = self.hit(name, key)
+                        if wait:
+                            return self._too_many(wait, template)
+                    for name, key_func in alarms:
+                        key = key_func()
+                        if key and self.hit(name, key):
+                            self._alarm(name)
+                return view(*args, **kwargs)
+            return wrapped
+        return decorator
+
+    def _alarm(self, name):
+        now = time.monotonic()
+        if now - self._alarmed.get(name, float('-inf')) < ALARM_INTERVAL:
+            return
+        self._alarmed[name] = now
+        print(f"限流告警：{name} 超出限额 {self.limits[name][0]} 次，请检查是否有人批量尝试")
+
+    @staticmethod
+    def _too_many(wait, template):
+        retry_after = max(1, math.ceil(wait))
+        message = f"尝试次数过多，请 {retry_after} 秒后再试"
+        if template:
+            flash(message, 'danger')
+            response = render_template(template)
+        else:
+            response = jsonify({"success": False, "message": message})
+        return response, 429, {'Retry-After': str(retry_after)}
+
+
+def client_ip():
+    # 部署在反向代理之后时，由 app.py 中的 ProxyFix（PROXY_FIX_HOPS）把 remote_addr 还原为真实客户端 IP
+    return request.remote_addr
+
+
+rate_limiter = RequestLimiter()
@@ -0,0 +1,220 @@
+# utils/related.py 相关推荐索引
+# 详情页原来用 ORDER BY random() 在整个分类里随机挑 3 篇，每次都要对全分类排序。
+# 现在为每篇指南预先算好 Top-N 相似指南存入 guide_related，请求时只读这 N 行再随机抽取。
+# 用户收藏变化只把指南标记为待刷新，由后台线程定期重算，收藏接口不做聚合查询和写入。
+import os
+import time
+import random
+import threading
+from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import GuideContent, GuideRelated, guide_tags, user_favorites
+
+TOP_N = 12              # 每篇指南保留的相似指南数量
+CATEGORY_CANDIDATES = 50  # 同分类候选只取最新的若干篇，避免大分类全量参与计算
+
+# 各项信号的权重
+WEIGHT_SAME_CATEGORY = 1.0
+WEIGHT_SHARED_TAG = 1.5
+WEIGHT_CO_FAVORITE = 0.5
+
+
+def compute_neighbors(guide, top_n=TOP_N):
+    """计算一篇指南的相似指南，返回 [(related_id, score), ...]，top_n 为 None 时返回全部候选"""
+    scores = defaultdict(float)
+
+    # 1. 同分类
+    same_category = db.session.query(GuideContent.id).filter(
+        GuideContent.category_id == guide.category_id,
+        GuideContent.id != guide.id,
+        GuideContent.is_published == True
+    ).order_by(GuideContent.created_at.desc()).limit(CATEGORY_CANDIDATES)
+    for (related_id,) in same_category:
+        scores[related_id] += WEIGHT_SAME_CATEGORY
+
+    # 2. 共同标签
+    other_tags = aliased(guide_tags)
+    shared_tags = db.session.query(other_tags.c.guide_id, func.count()).join(
+        guide_tags, guide_tags.c.tag_id == other_tags.c.tag_id
+    ).filter(
+        guide_tags.c.guide_id == guide.id,
+        other_tags.c.guide_id != guide.id
+    ).group_by(other_tags.c.guide_id)
+    for related_id, count in shared_tags:
+        scores[related_id] += WEIGHT_SHARED_TAG * count
+
+    # 3. 被同一批用户收藏
+    other_favs = aliased(user_favorites)
+    co_favorites = db.session.query(other_favs.c.guide_id, func.count()).join(
+        user_favorites, user_favorites.c.user_id == other_favs.c.user_id
+    ).filter(
+        user_favorites.c.guide_id == guide.id,
+        other_favs.c.guide_id != guide.id
+    ).group_by(other_favs.c.guide_id)
+    for related_id, count in co_favorites:
+        scores[related_id] += WEIGHT_CO_FAVORITE * count
+
+    if not scores:
+        return []
+
+    # 只推荐已发布的指南
+    published = {gid for (gid,) in db.session.query(GuideContent.id).filter(
+        GuideContent.id.in_(list(scores)), GuideContent.is_published == True)}
+    ranked = sorted(((gid, s) for gid, s in scores.items() if gid in published),
+                    key=lambda item: item[1], reverse=True)
+    return ranked[:top_n] if top_n else ranked
+
+
+def refresh_guide(guide):
+    """重新计算并写入一篇指南的相似列表（不提交事务）"""
+    GuideRelated.query.filter_by(guide_id=guide.id).delete(synchronize_session=False)
+    db.session.add_all([
+        GuideRelated(guide_id=guide.id, related_id=related_id, score=score)
+        for related_id, score in compute_neighbors(guide)
+    ])
+
+
+def _score_into_candidates(guide, candidates, skip_ids):
+    """
+    相似度是对称的：把 guide 按得分插入各候选指南的相似列表，
+    列表已满时只在得分高于其中最低分时替换掉最低的一条（不提交事务）
+    :param candidates: [(候选指南 id, 得分)]
+    :param skip_ids: 已经整体重算过的指南，不再处理
+    """
+    candidates = [(gid, score) for gid, score in candidates if gid not in skip_ids]
+    if not candidates:
+        return
+    lists = defaultdict(list)
+    for owner_id, related_id, score in db.session.query(
+        GuideRelated.guide_id, GuideRelated.related_id, GuideRelated.score
+    ).filter(GuideRelated.guide_id.in_([gid for gid, _ in candidates])):
+        lists[owner_id].append((score, related_id))
+    for owner_id, score in candidates:
+        current = sorted(lists[owner_id], reverse=True)
+        if any(related_id == guide.id for _, related_id in current):
+            continue
+        if len(current) >= TOP_N and score <= current[TOP_N - 1][0]:
+            continue
+        db.session.add(GuideRelated(guide_id=owner_id, related_id=guide.id, score=score))
+        dropped = [related_id for _, related_id in current[TOP_N - 1:]]
+        if dropped:
+            GuideRelated.query.filter(
+                GuideRelated.guide_id == owner_id, GuideRelated.related_id.in_(dropped)
+            ).delete(synchronize_session=False)
+
+
+def refresh_related(guide, cascade=True):
+    """
+    后台保存指南或用户收藏变化后调用：刷新这篇指南；cascade=True 时
+    一并刷新把它列为相似指南的其他指南（分类/标签变化会影响它们），
+    并把它按得分补进其他相似指南的列表（新发布的指南不必等全量重建才出现在别处）。
+    失败时只打印日志，不影响主流程
+    """
+    try:
+        refresh_guide(guide)
+        if not cascade:
+            db.session.commit()
+            return
+        dependents = GuideContent.query.join(
+            GuideRelated, GuideRelated.guide_id == GuideContent.id
+        ).filter(GuideRelated.related_id == guide.id).limit(TOP_N * 2).all()
+        for other in dependents:
+            refresh_guide(other)
+        if guide.is_published:
+            candidates = compute_neighbors(guide, top_n=None)[:CATEGORY_CANDIDATES]
+            _score_into_candidates(guide, candidates, {other.id for other in dependents})
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"相关推荐更新失败: {e}")
+
+
+class RelatedRefresher:
+    """
+    收藏变化后的相关推荐刷新：请求只标记指南，后台线程每隔 interval 秒
+    把标记过的指南各重算一次（热门指南被连续收藏多次也只算一次）。
+    进程退出时尚未刷新的标记会丢失，可用 `flask related rebuild` 补齐。
+    """
+    def __init__(self, interval=30):
+        self.interval = interval
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('RELATED_REFRESH_INTERVAL', self.interval)
+
+    def mark_dirty(self, guide_id):
+        with self._lock:
+            self._dirty.add(guide_id)
+        self._ensure_worker()
+
+    def flush(self):
+        """重算所有已标记的指南，返回重算数"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        guides = GuideContent.query.filter(GuideContent.id.in_(dirty)).all()
+        for guide in guides:
+            # 共同收藏只影响这篇指南自己的列表，不级联
+            refresh_related(guide, cascade=False)
+        return len(guides)
+
+    def _ensure_worker(self):
+        # gunicorn 预加载后 fork 的子进程不会继承线程，按进程号判断是否需要重新启动
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name='related-refresh', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(max(self.interval, 1))
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"相关推荐刷新线程异常: {e}")
+
+
+def rebuild_all():
+    """全量重建，供 `flask related rebuild` 使用"""
+    count = 0
+    for guide in GuideContent.query.filter_by(is_published=True).all():
+        refresh_guide(guide)
+        count += 1
+    db.session.commit()
+    return count
+
+
+def sample_related(guide, k=3):
+    """
+    从预先算好的 Top-N 中随机抽取 k 篇，保留“每次看到的不一样”的效果；
+    索引里还没有这篇指南时，退回同分类最新的 k 篇（走索引，不排序全表）
+    """
+    related_ids = [rid for (rid,) in db.session.query(GuideRelated.related_id)
+                   .filter_by(guide_id=guide.id)
+                   .order_by(GuideRelated.score.desc())]
+    if related_ids:
+        picked = random.sample(related_ids, min(k, len(related_ids)))
+        guides = GuideContent.query.filter(
+            GuideContent.id.in_(picked), GuideContent.is_published == True
+        ).all()
+        return sorted(guides, key=lambda g: picked.index(g.id))
+
+    return GuideContent.query.filter(
+        GuideContent.category_id == guide.category_id,
+        GuideContent.id != guide.id,
+        GuideContent.is_published == True
+    ).order_by(GuideContent.created_at.desc(), GuideContent.id.desc()).limit(k).all()
+
+
+related_refresher = RelatedRefresher()
@@ -0,0 +1,92 @@
+# utils/render_cache.py 指南正文渲染缓存
+import os
+import threading
+from collections import OrderedDict
+import markdown
+
+# 与详情页保持一致的 Markdown 扩展
+MARKDOWN_EXTENSIONS = [
+    'fenced_code',
+    'tables',
+    'nl2br',  # 自动换行
+    'toc'     # 自动生成目录（可选）
+]
+
+
+def render_markdown(text):
+    """将 Markdown 正文转换为 HTML"""
+    return markdown.markdown(text or '', extensions=MARKDOWN_EXTENSIONS)
+
+
+class MemoryLRUBackend:
+    """
+    进程内 LRU 存储，超过 max_size 时淘汰最久未访问的条目
+    任何实现了 get / set / delete 三个方法的对象（如 Redis 封装）都可以替换它
+    """
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RenderCache:
+    """
+    指南正文 HTML 缓存
+    缓存键为 (guide.id, guide.updated_at)：后台保存会刷新 updated_at，旧条目自然失效；
+    同时后台新增/编辑时会主动调用 invalidate，及时释放旧版本占用的空间
+    """
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryLRUBackend()
+
+    def set_backend(self, backend):
+        """切换到共享存储（多 worker 部署时使用）"""
+        self.backend = backend
+
+    @staticmethod
+    def _key(guide_id, updated_at):
+        stamp = updated_at.isoformat() if updated_at else ''
+        return f"guide:{guide_id}:{stamp}"
+
+    def get_or_render(self, guide, render_func=render_markdown):
+        """
+        命中缓存直接返回 HTML，否则渲染后写入缓存
+        :param guide: GuideContent 对象
+        :param render_func: 接收 Markdown 文本返回 HTML 的函数
+        """
+        key = self._key(guide.id, guide.updated_at)
+        html = self.backend.get(key)
+        if html is None:
+            html = render_func(guide.content)
+            self.backend.set(key, html)
+        return html
+
+    def invalidate(self, guide_id, updated_at):
+        """后台新增/编辑指南时调用，移除该版本的缓存"""
+        self.backend.delete(self._key(guide_id, updated_at))
+
+
+guide_render_cache = RenderCache(
+    MemoryLRUBackend(max_size=int(os.getenv('GUIDE_RENDER_CACHE_SIZE', 256)))
+)
@@ -0,0 +1,180 @@
+# utils/search.py 指南全文检索
+# SQLite 使用 FTS5 虚拟表，Postgres 使用 tsvector + GIN 索引，对外提供同一套接口。
+# 两种数据库自带的分词器都不认识中文，所以入库前先用 tokenize() 把中文切成单字和二元词组（bigram），
+# 再用空格拼接交给数据库按空白分词；查询词按二元词组切分，单个汉字的查询直接匹配单字。
+import re
+from abc import ABC, abstractmethod
+from sqlalchemy import text, inspect, Integer, Float
+from extensions import db
+from models import GuideContent
+
+# 连续的中日韩字符 / 连续的字母数字
+_CJK_RUN = re.compile(r'[㐀-䶿一-鿿豈-﫿]+')
+_TOKEN_RUN = re.compile(r'[㐀-䶿一-鿿豈-﫿]+|[0-9a-zA-Z]+')
+# Markdown 正文中的链接、图片地址不参与检索
+_URL = re.compile(r'https?://\S+')
+
+
+def tokenize(text_value, unigrams=False):
+    """
+    切分文本：中文按二元词组切分（“焦虑情绪” -> 焦虑 虑情 情绪），
+    英文和数字按单词切分并转为小写
+    :param unigrams: 是否同时输出单字（入库时使用，单个汉字的查询才能匹配到“心焦”这样字在词尾的文本）
+    """
+    tokens = []
+    for run in _TOKEN_RUN.findall(_URL.sub(' ', text_value or '')):
+        if _CJK_RUN.fullmatch(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                if unigrams:
+                    tokens.extend(run)
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def segment(text_value):
+    """切分后用空格拼接，作为写入数据库的检索文本"""
+    return ' '.join(tokenize(text_value, unigrams=True))
+
+
+def _document(guide):
+    return {
+        'guide_id': guide.id,
+        'title': segment(guide.title),
+        'summary': segment(guide.summary),
+        'body': segment(guide.content),
+        'tags': segment(' '.join(t.name for t in guide.tags)),
+    }
+
+
+class SearchBackend(ABC):
+    """检索后端接口"""
+    table_name = 'guide_search'
+
+    _available = False
+
+    def available(self):
+        """检索表是否已创建（未执行迁移时 list_guides 会退回 LIKE 查询）"""
+        if not self._available:
+            self._available = inspect(db.engine).has_table(self.table_name)
+        return self._available
+
+    @abstractmethod
+    def create_schema(self):
+        """创建检索表（已存在时跳过）"""
+
+    @abstractmethod
+    def index_guide(self, guide):
+        """写入或更新一篇指南的检索数据（由调用方提交事务）"""
+
+    def remove_guide(self, guide_id):
+        db.session.execute(text(f"DELETE FROM {self.table_name} WHERE {self.id_column} = :guide_id"),
+                           {'guide_id': guide_id})
+
+    @abstractmethod
+    def rank_subquery(self, query_text):
+        """
+        返回包含 guide_id、rank 两列的子查询（rank 越大越相关），
+        由调用方与 GuideContent 做 JOIN，继续叠加分类/标签过滤和分页
+        """
+
+    def reindex_all(self, batch_size=200):
+        """重建全部指南的检索数据"""
+        count = 0
+        for guide in GuideContent.query.order_by(GuideContent.id).yield_per(batch_size):
+            self.index_guide(guide)
+            count += 1
+        db.session.commit()
+        return count
+
+
+class SqliteFtsBackend(SearchBackend):
+    id_column = 'rowid'
+
+    def create_schema(self):
+        db.session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table_name} "
+            "USING fts5(title, summary, body, tags, tokenize='unicode61')"
+        ))
+        db.session.commit()
+
+    def index_guide(self, guide):
+        self.remove_guide(guide.id)
+        db.session.execute(text(
+            f"INSERT INTO {self.table_name} (rowid, title, summary, body, tags) "
+            "VALUES (:guide_id, :title, :summary, :body, :tags)"
+        ), _document(guide))
+
+    def rank_subquery(self, query_text):
+        tokens = tokenize(query_text)
+        # 单个汉字直接匹配索引里的单字，词组之间是 AND 关系
+        match = ' '.join(f'"{t}"' for t in tokens) or '""'
+        # bm25 越小越相关，取负数后统一为“越大越相关”；标题权重最高，其次标签、摘要、正文
+        stmt = text(
+            f"SELECT rowid AS guide_id, -bm25({self.table_name}, 10.0, 4.0, 1.0, 4.0) AS rank "
+            f"FROM {self.table_name} WHERE {self.table_name} MATCH :match"
+        ).bindparams(match=match).columns(guide_id=Integer, rank=Float)
+        return stmt.subquery('search_rank')
+
+
+class PostgresBackend(SearchBackend):
+    id_column = 'guide_id'
+
+    def create_schema(self):
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {self.table_name} ("
+            "guide_id INTEGER PRIMARY KEY REFERENCES guide_content(id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        ))
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{self.table_name}_document "
+            f"ON {self.table_name} USING GIN (document)"
+        ))
+        db.session.commit()
+
+    def index_guide(self, guide):
+        # 'simple' 配置只按空白切分、不做词干处理，正好配合预先切好的中文二元词组
+        db.session.execute(text(
+            f"INSERT INTO {self.table_name} (guide_id, document) VALUES (:guide_id, "
+            "setweight(to_tsvector('simple', :title), 'A') || "
+            "setweight(to_tsvector('simple', :tags), 'B') || "
+            "setweight(to_tsvector('simple', :summary), 'B') || "
+            "setweight(to_tsvector('simple', :body), 'C')) "
+            "ON CONFLICT (guide_id) DO UPDATE SET document = EXCLUDED.document"
+        ), _document(guide))
+
+    def rank_subquery(self, query_text):
+        tokens = tokenize(query_text)
+        # tokenize 的结果只包含汉字和字母数字，可以安全拼接为 tsquery
+        ts_query = ' & '.join(tokens) or "''"
+        stmt = text(
+            f"SELECT guide_id, ts_rank_cd(document, to_tsquery('simple', :ts_query)) AS rank "
+            f"FROM {self.table_name} WHERE document @@ to_tsquery('simple', :ts_query)"
+        ).bindparams(ts_query=ts_query).columns(guide_id=Integer, rank=Float)
+        return stmt.subquery('search_rank')
+
+
+_backends = {}
+
+
+def get_search_backend():
+    """按当前数据库类型返回对应的检索后端"""
+    dialect = db.engine.dialect.name
+    if dialect not in _backends:
+        _backends[dialect] = PostgresBackend() if dialect == 'postgresql' else SqliteFtsBackend()
+    return _backends[dialect]
+
+
+def index_guide(guide):
+    """后台新增/编辑指南后调用，失败时只打印日志，不影响保存"""
+    try:
+        backend = get_search_backend()
+        if backend.available():
+            backend.index_guide(guide)
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"检索索引更新失败: {e}")
@@ -0,0 +1,69 @@
+# utils/taxonomy_cache.py 分类/标签导航数据缓存
+import os
+import time
+import threading
+from types import SimpleNamespace
+from sqlalchemy import func
+from extensions import db
+from models import Category, Tag, GuideContent, guide_tags
+
+
+class TaxonomyCache:
+    """
+    全站导航用的分类、标签及其已发布指南数量，常驻内存
+    后台增删分类/标签或保存指南时调用 bump() 更新版本号，下一次读取时重建；
+    多 worker 部署时其他进程感知不到 bump，因此再加一个 ttl 兜底
+    """
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.version = 0
+        self._snapshot = None
+        self._built_version = -1
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def bump(self):
+        """分类/标签/指南发生变化时调用"""
+        with self._lock:
+            self.version += 1
+
+    def get(self):
+        """返回当前快照，过期时重建"""
+        snapshot = self._snapshot
+        if (snapshot is None or self._built_version != self.version
+                or time.monotonic() - self._built_at > self.ttl):
+            with self._lock:
+                version = self.version
+            snapshot = self._build()
+            self._snapshot, self._built_version, self._built_at = snapshot, version, time.monotonic()
+        return snapshot
+
+    def _build(self):
+        # 缓存的是普通对象而不是 ORM 实例，跨请求使用不会遇到会话失效的问题
+        category_counts = dict(
+            db.session.query(GuideContent.category_id, func.count(GuideContent.id))
+            .filter(GuideContent.is_published == True)
+            .group_by(GuideContent.category_id)
+            .all()
+        )
+        tag_counts = dict(
+            db.session.query(guide_tags.c.tag_id, func.count(guide_tags.c.guide_id))
+            .join(GuideContent, GuideContent.id == guide_tags.c.guide_id)
+            .filter(GuideContent.is_published == True)
+            .group_by(guide_tags.c.tag_id)
+            .all()
+        )
+        categories = [
+            SimpleNamespace(id=c.id, name=c.name, icon_url=c.icon_url, description=c.description,
+                            sort_order=c.sort_order, guide_count=category_counts.get(c.id, 0))
+            for c in Category.query.order_by(Category.sort_order.asc()).all()
+        ]
+        tags = [
+            SimpleNamespace(id=t.id, name=t.name, guide_count=tag_counts.get(t.id, 0))
+            for t in Tag.query.all()
+        ]
+        return SimpleNamespace(categories=categories, tags=tags,
+                               category_counts=category_counts, tag_counts=tag_counts)
+
+
+taxonomy_cache = TaxonomyCache(ttl=int(os.getenv('TAXONOMY_CACHE_TTL', 60)))
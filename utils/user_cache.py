@@ -0,0 +1,83 @@
+# utils/user_cache.py 登录用户缓存
+# Flask-Login 每个请求都要通过 user_loader 取当前用户，页面只用到 id、昵称、付费/管理员标记等少数字段。
+# 这里缓存一份精简的用户快照（普通对象，不绑定数据库会话），短 TTL 过期；
+# 后台切换付费状态、激活码激活等修改用户的地方调用 invalidate()，本进程立即生效，
+# 多 worker 部署时其他进程依靠 ttl 兜底（与 taxonomy_cache 相同）。
+import os
+import time
+import threading
+from flask_login import UserMixin
+from extensions import db
+from models import User
+
+
+class UserSnapshot(UserMixin):
+    """当前用户的只读快照，提供模板和视图用到的字段与查询方法"""
+    def __init__(self, user, version):
+        self.id = user.id
+        self.username = user.username
+        self.is_paid = bool(user.is_paid)
+        self.is_admin = bool(user.is_admin)
+        self.created_at = user.created_at
+        self.version = version
+
+    # 这两个方法只依赖 self.id，直接复用 User 上的实现
+    favorites_query = User.favorites_query
+    has_favorited = User.has_favorited
+
+    def __repr__(self):
+        return f"<UserSnapshot {self.id} v{self.version}>"
+
+
+class UserCache:
+    """
+    :param ttl: 快照有效期（秒）
+    :param max_size: 最多缓存的用户数，超出时先清理过期项，再淘汰最早加载的
+    """
+    def __init__(self, ttl=60, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}   # user_id -> (快照, 加载时间)
+        self._versions = {}  # user_id -> 失效次数
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """返回用户快照，用户不存在时返回 None"""
+        entry = self._entries.get(user_id)
+        if entry and time.monotonic() - entry[1] <= self.ttl:
+            return entry[0]
+
+        with self._lock:
+            version = self._versions.get(user_id, 0)
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = UserSnapshot(user, version)
+        with self._lock:
+            # 查询期间如果发生了 invalidate，读到的可能是旧数据，本次只用不缓存
+            if self._versions.get(user_id, 0) == version:
+                self._store(user_id, snapshot)
+        return snapshot
+
+    def invalidate(self, user_id):
+        """用户的付费/管理员状态或资料变化后调用"""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            for user_id in self._entries:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.clear()
+
+    def _store(self, user_id, snapshot):
+        now = time.monotonic()
+        if len(self._entries) >= self.max_size:
+            self._entries = {k: v for k, v in self._entries.items() if now - v[1] <= self.ttl}
+            while len(self._entries) >= self.max_size:
+                self._entries.pop(next(iter(self._entries)))
+        self._entries[user_id] = (snapshot, now)
+
+
+user_cache = UserCache(ttl=int(os.getenv('USER_CACHE_TTL', 60)))
@@ -0,0 +1,115 @@
+# utils/view_counter.py 阅读数写回缓冲
+import os
+import time
+import threading
+from collections import defaultdict
+from sqlalchemy import update, bindparam
+from flask import current_app
+from extensions import db
+from models import GuideContent
+
+
+class ViewCounter:
+    """
+    阅读数聚合器：请求内只在内存里累加，由后台线程每隔 flush_interval 秒
+    按指南合并成一条 UPDATE ... SET view_count = view_count + n 批量写回数据库。
+    写回不依赖后续请求，访问停下来之后缓冲中的阅读数也会在一个间隔内落库。
+    写库失败的增量会追加到本地日志，之后可用 `flask views flush` 补写。
+    """
+    def __init__(self, flush_interval=5, log_name='view_counts.log'):
+        self.flush_interval = flush_interval
+        self.log_name = log_name
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.get('VIEW_FLUSH_INTERVAL', self.flush_interval)
+        self.log_path = os.path.join(app.instance_path, self.log_name)
+
+    def incr(self, guide_id, n=1):
+        """记录一次阅读，只在内存中累加，写回由后台线程完成"""
+        with self._lock:
+            self._pending[guide_id] += n
+        self._ensure_flusher()
+
+    def pending_for(self, guide_id):
+        """尚未写回数据库的阅读数（详情页展示时加上，避免数字“倒退”）"""
+        return self._pending.get(guide_id, 0)
+
+    def flush(self):
+        """把内存中的增量批量写回数据库，返回写回的指南数"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        if not pending:
+            return 0
+        try:
+            self._write(pending)
+        except Exception as e:
+            print(f"阅读数写回失败，已转存到本地日志: {e}")
+            self._append_log(pending)
+            return 0
+        return len(pending)
+
+    def replay_log(self):
+        """把本地日志中积压的增量写回数据库，成功后清空日志"""
+        path = self._log_path()
+        if not os.path.exists(path):
+            return 0
+        pending = defaultdict(int)
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    pending[int(parts[0])] += int(parts[1])
+        if pending:
+            self._write(pending)
+        os.remove(path)
+        return len(pending)
+
+    def _ensure_flusher(self):
+        # gunicorn 预加载后 fork 的子进程不会继承线程，按进程号判断是否需要重新启动
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name='view-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(max(self.flush_interval, 1))
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"阅读数写回线程异常: {e}")
+
+    def _write(self, pending):
+        table = GuideContent.__table__
+        # 显式写回 updated_at 本身，避免 onupdate 把阅读计数当成内容修改
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam('guide_id'))
+            .values(view_count=table.c.view_count + bindparam('n'),
+                    updated_at=table.c.updated_at)
+        )
+        # 使用独立连接，不影响当前请求的 db.session
+        with db.engine.begin() as conn:
+            conn.execute(stmt, [{'guide_id': gid, 'n': n} for gid, n in pending.items()])
+
+    def _log_path(self):
+        return getattr(self, 'log_path', None) or os.path.join(current_app.instance_path, self.log_name)
+
+    def _append_log(self, pending):
+        path = self._log_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as f:
+            for gid, n in pending.items():
+                f.write(f"{gid} {n}\n")
+
+
+view_counter = ViewCounter()